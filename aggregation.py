@@ -0,0 +1,112 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+from case_result import MISSING
+from streaks import batch_payment_streaks
+
+# A combined ledger frame with no rows, in the types combine_ledgers gives its columns
+EMPTY_COLUMNS = {
+    'date': np.array([], dtype='datetime64[ns]'),
+    'code': np.array([], dtype=object),
+    'description': np.array([], dtype=object),
+    'count': np.array([], dtype=float),
+    'party': np.array([], dtype=object),
+    'amount': np.array([], dtype=float),
+}
+
+
+def case_codes(ledgers):
+    # Position of each row's case, for ledgers laid end to end
+    return np.repeat(np.arange(len(ledgers)), [len(ledger) for ledger in ledgers])
+
+
+def combine_ledgers(case_numbers, ledgers):
+    """Every ledger's rows in one frame, case by case, in order.
+
+    A categorical 'case' column comes first, then the fee table columns,
+    then the amounts again as int64 'cents' (MISSING where there is none).
+    """
+    columns = [ledger.columns() for ledger in ledgers]
+    frame = {'case': pd.Categorical.from_codes(case_codes(ledgers), categories=pd.Index(case_numbers))}
+    for name, empty in EMPTY_COLUMNS.items():
+        frame[name] = np.concatenate([ledger[name] for ledger in columns]) if columns else empty
+    frame['cents'] = (np.concatenate([ledger.cents for ledger in ledgers]) if ledgers
+                      else np.array([], dtype=np.int64))
+    return pd.DataFrame(frame)
+
+
+def case_cents(ledgers):
+    # Sum of each case's amounts in cents, rows without an amount counting as zero
+    if not ledgers:
+        return np.array([], dtype=np.int64)
+    cents = np.concatenate([ledger.cents for ledger in ledgers])
+    weights = np.where(cents == MISSING, 0, cents)
+    return np.bincount(case_codes(ledgers), weights=weights, minlength=len(ledgers)).astype(np.int64)
+
+
+class ResultsAggregate:
+    """Figures for a client's cases, worked out from all their paid and issued ledgers at once.
+
+    `cases` has a row per case, in `results` order, with its totals owed
+    and paid, longest streak and its end, and months paid. `summary` has
+    the toplines for Step 4 and the Excel summary sheet, including the
+    streak over all cases together. Both come from the ledgers' typed
+    arrays; `paid` and `issued`, the combined ledgers as frames (see
+    combine_ledgers), are only decoded when asked for.
+    """
+
+    def __init__(self, results):
+        self.case_numbers = list(results)
+        self.paid_ledgers = [result.paid for result in results.values()]
+        self.issued_ledgers = [result.issued for result in results.values()]
+        n_cases = len(self.case_numbers)
+
+        owed_cents = case_cents(self.issued_ledgers)
+        paid_cents = case_cents(self.paid_ledgers)
+
+        # Streaks per case and over all cases in one pass: the paid dates go in twice,
+        # under their case and under an extra key (n_cases) standing for every case
+        codes = case_codes(self.paid_ledgers)
+        dates = (np.concatenate([ledger.datetimes for ledger in self.paid_ledgers]) if self.paid_ledgers
+                 else EMPTY_COLUMNS['date'])
+        streaks = batch_payment_streaks(np.concatenate([codes, np.full(len(codes), n_cases)]),
+                                        np.concatenate([dates, dates])).reindex(np.arange(n_cases + 1))
+        streak_length = streaks['streak_length'].fillna(0).to_numpy(dtype=np.int64)
+        total_paid_months = streaks['total_paid_months'].fillna(0).to_numpy(dtype=np.int64)
+
+        self.cases = pd.DataFrame({
+            'total_amount_owed': owed_cents / 100,
+            'total_amount_paid': paid_cents / 100,
+            'streak_length': streak_length[:n_cases],
+            'streak_end': streaks['streak_end'].to_numpy()[:n_cases],
+            'total_paid_months': total_paid_months[:n_cases],
+        }, index=pd.Index(self.case_numbers, name='case'))
+
+        self.summary = {
+            'Total Cases Searched': n_cases,
+            'Total Fees Issued': round(int(owed_cents.sum()) / 100, 2),
+            'Total Fees Paid': round(int(paid_cents.sum()) / 100, 2),
+            'Total Months Paid': int(total_paid_months[:n_cases].sum()),
+            'Max Consecutive Months Paid - Individual': int(streak_length[:n_cases].max(initial=0)),
+            'Max Consecutive Months Paid - All': int(streak_length[n_cases]),
+        }
+
+    @functools.cached_property
+    def paid(self):
+        return combine_ledgers(self.case_numbers, self.paid_ledgers)
+
+    @functools.cached_property
+    def issued(self):
+        return combine_ledgers(self.case_numbers, self.issued_ledgers)
+
+    def case_rows(self, ledger, position):
+        """The fee table of the case at `position` in `results`, from the combined `ledger` (paid or issued)."""
+        # Cases sit in order in the combined ledgers, so each one is a contiguous slice
+        start, end = np.searchsorted(ledger['case'].cat.codes.to_numpy(), [position, position + 1])
+        return ledger.iloc[start:end][list(EMPTY_COLUMNS)].reset_index(drop=True)
+
+
+def aggregate_results(results):
+    return ResultsAggregate(results)
@@ -1,6 +1,9 @@
 import streamlit as st
 from utils import *
 from data_processing import *
+from case_state import default_store
+from timing import Trace, activate
+from odcr_details import odcr_detail_links, scrape_odcr_details
 
 def check_password():
     """Returns `True` if the user had the correct password."""
@@ -33,7 +36,11 @@ def check_password():
 if check_password():
 
     guid = st.secrets['guid']
-    alias_df, sentence_df, profile_df = load_dataframes()
+
+    # Timing spans are only collected while the diagnostics panel is on
+    diagnostics = st.sidebar.checkbox("Diagnostics")
+    trace = activate(Trace() if diagnostics else None)
+    alias_df, sentence_df, profile_df, doc_index = load_dataframes()
 
     st.title("Step 1: Find Client ID")
     st.write("Source: https://okoffender.doc.ok.gov/")
@@ -43,18 +50,22 @@ if check_password():
     last_name = st.text_input("Last name:")
 
     if first_name and last_name:
-        filtered_df = filter_alias_df(alias_df, first_name, last_name)
+        filtered_df = filter_alias_df(alias_df, first_name, last_name, doc_index)
         st.write(filtered_df.reset_index(drop=True))
 
+    if (first_name or last_name) and (not (first_name and last_name) or filtered_df.empty):
+        st.write("Closest matches:")
+        st.write(suggest_alias_df(alias_df, first_name, last_name, doc_index))
+
     st.title("Step 2: Get Offender Record")
     st.write("Source: https://okoffender.doc.ok.gov/")
     id = st.text_input("Client ID:")
 
     if id:
-        filtered_sentence_df = filter_sentence_df(sentence_df, id)
+        filtered_sentence_df = filter_sentence_df(sentence_df, id, doc_index)
 
         status, facility, official_last_name, official_first_name, official_middle_name, filtered_profile_df = search_profile(
-            profile_df, id)
+            profile_df, id, doc_index)
 
         if not middle_name and official_middle_name:
             middle_name = official_middle_name
@@ -79,7 +90,7 @@ if check_password():
                         filtered_sentence_df['community_sentence'] > 0), 'crf_number'].unique()
 
             st.write(f"**Status**: {status}")
-            st.write(f"**Facility**: {facility.title()}")
+            st.write(f"**Facility**: {(facility or '').title()}")
 
             if eligible_counties.size > 0 and eligible_cases.size > 0:
                 st.write(f"**Eligible Counties**: {', '.join(eligible_counties)}")
@@ -97,10 +108,7 @@ if check_password():
     if first_name and last_name:
         search_checkbox = st.checkbox("Search Cases")
         if search_checkbox:
-            if middle_name:
-                combined_df = search_cases(guid, first_name, last_name, middle_name)
-            else:
-                combined_df = search_cases(guid, first_name, last_name)
+            combined_df = search_cases(guid, first_name, last_name, middle_name)
             unique_courts = combined_df['Court'].unique().tolist()
             try:
                 formatted_eligible_counties = [format_county(county) for county in eligible_counties]
@@ -120,56 +128,77 @@ if check_password():
             filtered_df.insert(0, 'selected', True)
             edited_df = st.data_editor(filtered_df, use_container_width=True, num_rows="dynamic", key="unique_key")
 
+            # Start downloading the dockets still selected while the list is looked over
+            docket_loader(guid, first_name, last_name, middle_name, combined_df, default_store()).prefetch(
+                edited_df.loc[edited_df['selected'] == True, 'Case Number'].tolist())
+
     st.title("Step 4: Summarize Fees")
 
+    include_odcr = st.checkbox("Include ODCR receipts")
+
     if st.button("Done selecting? Click here to pull data."):
 
         keep_rows = edited_df.loc[edited_df['selected'] == True].index.tolist()
         case_list = edited_df.loc[keep_rows, 'Case Number'].tolist()
         url_list = edited_df.loc[keep_rows, 'Link'].tolist()
-        html_list = edited_df.loc[keep_rows, 'HTML'].tolist()
-
-        oscn_case_soup_dict = create_case_soup_dict(case_list, html_list)
-        results = process_urls(oscn_case_soup_dict, first_name, last_name)
-
-        total_fees_paid_sum = 0
-        total_fees_issued_sum = 0
-        total_months_paid_sum = 0
 
-        try:
-            max_consecutive_sum = max([result[0] for result in results.values()])
-        except ValueError:
+        # Dockets were calculated as they downloaded; wait for any still on their way
+        progress_text = st.empty()
+        loader = docket_loader(guid, first_name, last_name, middle_name, combined_df, default_store())
+        dockets = loader.wait(case_list, progress=progress_text.text)
+        results = {case: dockets[case][1] for case in case_list if case in dockets}
+        for error in loader.failures(case_list).values():
+            st.warning(f"{error}. It is left out of the summary; deselect it or click again to retry.")
+
+        results = dict(sorted(results.items(), key=lambda item: item[1].streak_length, reverse=True))
+        # One pass over every ledger for the toplines here and in the workbook
+        aggregate = aggregate_results(results)
+        summary = aggregate.summary
+
+        # Receipts from every ODCR case for the name, fetched and parsed together
+        odcr_details = None
+        if include_odcr:
+            from web_scraping import search_cases as search_odcr_cases  # Selenium only loads when asked for
+            odcr_links = odcr_detail_links(search_odcr_cases(f"{last_name}, {first_name}"))
+            odcr_details = scrape_odcr_details(odcr_links, progress=progress_text.text)
+        excel_content = generate_excel_content(results, summary, case_list, url_list, aggregate=aggregate,
+                                               odcr_details=odcr_details)
+
+        # Held in session state for this selection, so later widget interactions redraw
+        # the results instead of dropping them or calculating them again
+        st.session_state['fee_summary'] = {
+            'selection': (name_key(first_name, last_name, middle_name), tuple(case_list), include_odcr),
+            'results': results,
+            'summary': summary,
+            'case_list': case_list,
+            'url_list': url_list,
+            'excel': excel_content.getvalue(),
+        }
+
+    fee_summary = st.session_state.get('fee_summary')
+    if fee_summary is not None and combined_df is not None:
+        selected_cases = edited_df.loc[edited_df['selected'] == True, 'Case Number'].tolist()
+        if fee_summary['selection'] != (name_key(first_name, last_name, middle_name), tuple(selected_cases),
+                                        include_odcr):
+            fee_summary = None
+
+    if fee_summary is not None and combined_df is not None:
+        results, summary = fee_summary['results'], fee_summary['summary']
+        case_list, url_list = fee_summary['case_list'], fee_summary['url_list']
+
+        if not results:
             st.write(f"No results found for {first_name.title()} {last_name.title()}")
 
-
-        for case_number, result in results.items():
-            streak_length, total_paid_months, streak_end, total_amount_paid, total_amount_owed, has_payment_plan, already_received_waiver, fee_table_paid, fee_table_issued = result
-            total_fees_paid_sum += total_amount_paid
-            total_fees_issued_sum += total_amount_owed
-            total_months_paid_sum += total_paid_months  # Add this line
-
-        results = dict(sorted(results.items(), key=lambda item: item[1][0], reverse=True))
-
-        total_fees_issued_sum = round(total_fees_issued_sum, 2)
-        total_fees_paid_sum = round(total_fees_paid_sum, 2)
-
-        st.write("Total Cases Searched: ", len(results))
-        st.write("Total Fees Issued: ", total_fees_issued_sum)
-        st.write("Total Fees Paid: ", total_fees_paid_sum)
-        st.write("Total Months Paid: ", total_months_paid_sum)
-        st.write("Max Consecutive Months Paid: ", max_consecutive_sum)
-
-        excel_content = generate_excel_content(results, {
-            'Total Cases Searched': len(results),
-            'Total Fees Issued': total_fees_issued_sum,
-            'Total Fees Paid': total_fees_paid_sum,
-            'Total Months Paid': total_months_paid_sum,
-            'Max Consecutive Months Paid - Individual': max_consecutive_sum
-        }, case_list, url_list)
+        st.write("Total Cases Searched: ", summary['Total Cases Searched'])
+        st.write("Total Fees Issued: ", summary['Total Fees Issued'])
+        st.write("Total Fees Paid: ", summary['Total Fees Paid'])
+        st.write("Total Months Paid: ", summary['Total Months Paid'])
+        st.write("Max Consecutive Months Paid: ", summary['Max Consecutive Months Paid - Individual'])
+        st.write("Max Consecutive Months Paid Across Cases: ", summary['Max Consecutive Months Paid - All'])
 
         st.download_button(
             label="Download Excel",
-            data=excel_content,
+            data=fee_summary['excel'],
             file_name=f"{last_name}_{first_name}_.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
@@ -181,21 +210,26 @@ if check_password():
             st.markdown(f"**Results for Case Number: {case_number}**")
             url_index = case_list.index(case_number)
             st.write("URL: ", url_list[url_index])
-            streak_length, total_paid_months, streak_end, total_amount_paid, total_amount_owed, has_payment_plan, already_received_waiver, fee_table_paid, fee_table_issued = result
-            st.write("Streak Length: ", streak_length)
-            st.write("Total Paid Months: ", total_paid_months)
-            st.write("Streak End: ", streak_end)
-            st.write("Total Amount Paid: ", total_amount_paid)
-            st.write("Total Amount Owed: ", total_amount_owed)
-            st.write("Fee Table Paid: ", fee_table_paid)
-            st.write("Fee Table Issued: ", fee_table_issued)
-            total_fees_paid_sum += total_amount_paid
-            total_fees_issued_sum += total_amount_owed
-            total_months_paid_sum += total_paid_months  # Add this line
+            st.write("Streak Length: ", result.streak_length)
+            st.write("Total Paid Months: ", result.total_paid_months)
+            st.write("Streak End: ", result.streak_end)
+            st.write("Total Amount Paid: ", result.total_amount_paid)
+            st.write("Total Amount Owed: ", result.total_amount_owed)
+            st.write("Fee Table Paid: ", result.fee_table_paid)
+            st.write("Fee Table Issued: ", result.fee_table_issued)
             st.write("---")
 
-
-
-
-
-
+    if trace is not None:
+        trace.export()
+        with st.expander("Diagnostics"):
+            st.write("Time per stage (nested stages are included in their parents):")
+            st.dataframe(trace.stage_summary())
+            st.write("Counters:", trace.counters)
+            case_summary = trace.case_summary()
+            if not case_summary.empty:
+                st.write("Seconds per case:")
+                st.dataframe(case_summary)
+            st.download_button("Download spans (JSON lines)", trace.to_jsonl(), file_name="timing.jsonl",
+                               mime="application/x-ndjson")
+            st.download_button("Download metrics (Prometheus)", trace.to_prometheus(), file_name="timing.prom",
+                               mime="text/plain")
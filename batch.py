@@ -0,0 +1,190 @@
+"""Run the four app steps for a roster of clients without Streamlit.
+
+    python batch.py roster.csv --out batch_output --guid <user agent>
+
+The roster has either an `id` column (DOC ids, names come from the
+profile table) or `first_name`/`last_name` (and optionally `middle_name`)
+columns. Each client gets `<out>/<key>.xlsx`. Finished clients are
+appended to `<out>/checkpoint.jsonl`, so re-running the same command
+resumes an interrupted batch where it stopped. Per-case state (see
+case_state) is kept across runs, so a monthly refresh only recalculates
+dockets that changed.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from case_state import STATE_PATH, CaseStateStore
+from data_processing import fetch_dockets, process_context, run_case_search, MAX_IN_FLIGHT, REQUESTS_PER_SECOND
+from utils import (filter_sentence_df, format_county, generate_excel_content, load_dataframes, search_profile,
+                   summarize_results)
+
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+# Searches started per client search thread before their results are taken
+CLIENTS_AHEAD = 2
+
+
+def client_key(row):
+    if row.get('id'):
+        return str(row['id'])
+    parts = [row.get('last_name'), row.get('first_name'), row.get('middle_name')]
+    return '_'.join(re.sub(r'\W+', '', part).lower() for part in parts if part)
+
+
+def read_roster(path):
+    roster = pd.read_csv(path, dtype=str).fillna('')
+    roster.columns = [column.strip().lower() for column in roster.columns]
+    if 'id' not in roster.columns and not {'first_name', 'last_name'} <= set(roster.columns):
+        raise ValueError("Roster needs an 'id' column or 'first_name' and 'last_name' columns")
+    return roster.to_dict('records')
+
+
+def read_checkpoint(out_dir):
+    done = set()
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by the interruption
+                if record.get('status') == 'ok':
+                    done.add(record['key'])
+    return done
+
+
+def append_checkpoint(out_dir, record):
+    with open(os.path.join(out_dir, CHECKPOINT_FILE), 'a') as f:
+        f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def resolve_client(row, tables):
+    """Names and court filter for a roster row, as Steps 1 and 2 would pick them."""
+    first_name, last_name, middle_name = row.get('first_name', ''), row.get('last_name', ''), row.get('middle_name', '')
+    courts = None
+    if row.get('id'):
+        alias_df, sentence_df, profile_df, doc_index = tables
+        _, _, official_last, official_first, official_middle, _ = search_profile(profile_df, row['id'], doc_index)
+        if official_first and official_last:
+            first_name, last_name = official_first, official_last
+        if not middle_name and official_middle:
+            middle_name = official_middle
+        sentences = filter_sentence_df(sentence_df, row['id'], doc_index)
+        eligible = sentences.loc[sentences['community_sentence'].notnull() & (sentences['community_sentence'] > 0),
+                                 'sentencing_court'].unique()
+        if len(eligible):
+            courts = [format_county(county) for county in eligible]
+    return first_name, last_name, middle_name, courts
+
+
+def search_client(row, tables, guid, max_in_flight, requests_per_second):
+    first_name, last_name, middle_name, courts = resolve_client(row, tables)
+    if not (first_name and last_name):
+        raise ValueError('No name for client')
+    # Narrow to the client's sentencing courts before any docket is downloaded
+    cases = run_case_search(guid, first_name, last_name, middle_name, requests_per_second=requests_per_second,
+                            fetch=False)
+    if not cases.empty and courts is not None:
+        cases = cases.loc[cases['Court'].isin(courts)]
+    if not cases.empty:
+        cases = fetch_dockets(cases, guid, first_name, last_name, max_in_flight, requests_per_second)
+    return first_name, last_name, cases
+
+
+def run(roster_path, out_dir, guid, parse_workers=None, clients_in_flight=2, max_in_flight=MAX_IN_FLIGHT,
+        requests_per_second=REQUESTS_PER_SECOND, state_path=STATE_PATH):
+    os.makedirs(out_dir, exist_ok=True)
+    done = read_checkpoint(out_dir)
+    pending = [row for row in read_roster(roster_path) if client_key(row) not in done]
+    print(f'{len(done)} clients already done, {len(pending)} to go')
+
+    # The DOC tables are only needed to resolve roster rows given by id
+    state = CaseStateStore(state_path)
+    tables = load_dataframes() if any(row.get('id') for row in pending) else None
+    start = time.perf_counter()
+    finished = 0
+
+    # Searches (network bound) run a few clients ahead on threads; parsing and
+    # calculation (CPU bound) go to a process pool, started without forking those threads.
+    # Every search and download in the run shares one per-host rate limit (see fetching.shared_limiter).
+    rows = iter(pending)
+    searches = deque()
+    with ThreadPoolExecutor(max_workers=clients_in_flight) as fetchers, \
+            ProcessPoolExecutor(max_workers=parse_workers, mp_context=process_context()) as parsers:
+        def submit(count):
+            # Only a window of clients is searched ahead, so finished searches do not pile up in memory
+            for row in itertools.islice(rows, count):
+                searches.append((row, fetchers.submit(search_client, row, tables, guid, max_in_flight,
+                                                      requests_per_second)))
+
+        submit(CLIENTS_AHEAD * clients_in_flight)
+        while searches:
+            row, search = searches.popleft()
+            key = client_key(row)
+            record = {'key': key}
+            statuses = Counter()
+            try:
+                first_name, last_name, cases = search.result()
+                case_list = cases['Case Number'].tolist() if not cases.empty else []
+                url_list = cases['Link'].tolist() if not cases.empty else []
+                # Workers get each case's saved state and hand back the updated one
+                htmls = cases['HTML'].tolist() if not cases.empty else []
+                results = state.calculate_all(list(zip(case_list, htmls)), first_name, last_name,
+                                              executor=parsers, statuses=statuses)
+
+                summary = summarize_results(results)
+                results = dict(sorted(results.items(), key=lambda item: item[1].streak_length, reverse=True))
+                path = os.path.join(out_dir, f'{key}.xlsx')
+                with open(path, 'wb') as f:
+                    f.write(generate_excel_content(results, summary, case_list, url_list).getvalue())
+                record.update(status='ok', file=path, first_name=first_name, last_name=last_name, **summary)
+                record['cases'] = dict(statuses)
+            except Exception as e:
+                record.update(status='error', error=f'{type(e).__name__}: {e}')
+            append_checkpoint(out_dir, record)
+            submit(1)
+
+            finished += 1
+            rate = finished / (time.perf_counter() - start) * 60
+            cases = ', '.join(f'{count} {status}' for status, count in statuses.items()) or 'no cases'
+            print(f'[{finished}/{len(pending)}] {key}: {record["status"]} [{cases}] ({rate:.1f} clients/min)')
+
+    elapsed = time.perf_counter() - start
+    if finished:
+        print(f'Processed {finished} clients in {elapsed:.0f} s ({finished / elapsed * 60:.1f} clients/min)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('roster', help='CSV of DOC ids or client names')
+    parser.add_argument('--out', default='batch_output', help='directory for workbooks and the checkpoint')
+    parser.add_argument('--guid', default=os.environ.get('OSCN_GUID'), help='User-Agent for OSCN (or $OSCN_GUID)')
+    parser.add_argument('--parse-workers', type=int, default=None, help='processes for parsing (default: CPUs)')
+    parser.add_argument('--clients-in-flight', type=int, default=2, help='clients searched concurrently')
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT, help='docket downloads per client')
+    parser.add_argument('--requests-per-second', type=float, default=REQUESTS_PER_SECOND,
+                        help='request rate per host, shared by every search and download in the run')
+    parser.add_argument('--state', default=STATE_PATH,
+                        help='per-case state from earlier runs, so unchanged dockets are not recalculated')
+    args = parser.parse_args()
+    if not args.guid:
+        parser.error('--guid or $OSCN_GUID is required')
+
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    run(args.roster, args.out, args.guid, args.parse_workers, args.clients_in_flight, args.max_in_flight,
+        args.requests_per_second, args.state)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Index vs full-scan lookups over a synthetic DOC extract.
+
+    python benchmarks/bench_doc_index.py [n_rows]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import pandas as pd
+
+from doc_index import DocIndex
+
+FIRST = ['JOHN', 'JAMES', 'MARY', 'LINDA', 'ROBERT', 'PATRICIA', 'MICHAEL', 'BARBARA', 'DAVID', 'SUSAN']
+LAST = ['SMITH', 'JOHNSON', 'WILLIAMS', 'BROWN', 'JONES', 'GARCIA', 'MILLER', 'DAVIS', 'WILSON', 'MOORE']
+
+
+def synthetic_doc(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.char.zfill(rng.integers(0, n_rows // 3, n_rows).astype(str), 7)
+    first = np.char.add(np.array(FIRST)[rng.integers(0, len(FIRST), n_rows)], rng.integers(0, 2000, n_rows).astype(str))
+    last = np.char.add(np.array(LAST)[rng.integers(0, len(LAST), n_rows)], rng.integers(0, 2000, n_rows).astype(str))
+    alias_df = pd.DataFrame({'id': ids, 'last_name': last, 'first_name': first})
+    sentence_df = pd.DataFrame({'id': ids, 'crf_number': '15-1001', 'community_sentence': 1.0})
+    profile_df = pd.DataFrame({'id': ids[: n_rows // 3], 'last_name': last[: n_rows // 3],
+                               'first_name': first[: n_rows // 3]})
+    return alias_df.astype(object), sentence_df.astype({'id': object}), profile_df.astype(object)
+
+
+def per_lookup(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(*query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    alias_df, sentence_df, profile_df = synthetic_doc(n_rows)
+
+    start = time.perf_counter()
+    doc_index = DocIndex(alias_df, sentence_df, profile_df)
+    print(f'{n_rows} rows, index build: {time.perf_counter() - start:.2f} s')
+    start = time.perf_counter()
+    doc_index.alias_search
+    print(f'fuzzy name search index, built on first use: {time.perf_counter() - start:.2f} s')
+
+    names = [(first, last) for first, last in alias_df[['first_name', 'last_name']].sample(20, random_state=1).to_numpy()]
+    ids = [(id,) for id in sentence_df['id'].sample(20, random_state=2)]
+
+    scans = {
+        'alias name': (lambda first, last: alias_df[alias_df['first_name'].str.lower().eq(first.lower()) &
+                                                    alias_df['last_name'].str.lower().eq(last.lower())], names),
+        'sentence id': (lambda id: sentence_df.loc[sentence_df['id'].eq(id)], ids),
+    }
+    lookups = {
+        'alias name': (lambda first, last: alias_df.iloc[doc_index.alias_names.lookup(first, last)], names),
+        'sentence id': (lambda id: sentence_df.iloc[doc_index.sentence_ids.lookup(id)], ids),
+    }
+    for name in scans:
+        scan = per_lookup(*scans[name])
+        indexed = per_lookup(*lookups[name])
+        print(f'{name:<12} scan {scan * 1000:9.2f} ms   index {indexed * 1000:7.3f} ms   {scan / indexed:7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Cold-start time and resident memory: pd.read_csv vs the memory-mapped columnar copy.
+
+    python benchmarks/bench_doc_store.py [n_rows]
+
+Each load runs in a fresh interpreter so peak RSS is per process.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from benchmarks.bench_doc_index import synthetic_doc
+
+STATUSES = ['ACTIVE', 'INACTIVE', 'PROBATION', 'PAROLE']
+FACILITIES = ['JOSEPH HARP CC', 'DICK CONNER CC', 'MABEL BASSETT CC', 'OKLAHOMA STATE PENITENTIARY', 'COMMUNITY']
+COURTS = ['TULSA COUNTY COURT', 'OKLAHOMA COUNTY COURT', 'CLEVELAND COUNTY COURT', 'COMANCHE COUNTY COURT']
+
+
+def write_csvs(directory, n_rows):
+    rng = np.random.default_rng(0)
+    alias_df, sentence_df, profile_df = synthetic_doc(n_rows)
+    sentence_df['sentencing_court'] = np.array(COURTS)[rng.integers(0, len(COURTS), len(sentence_df))]
+    sentence_df['prison_sentence'] = rng.integers(0, 240, len(sentence_df)).astype(float)
+    profile_df['status'] = np.array(STATUSES)[rng.integers(0, len(STATUSES), len(profile_df))]
+    profile_df['facility'] = np.array(FACILITIES)[rng.integers(0, len(FACILITIES), len(profile_df))]
+    alias_df.to_csv(os.path.join(directory, 'alias.csv'), index=False)
+    sentence_df.to_csv(os.path.join(directory, 'sentence.csv'), index=False)
+    profile_df.to_csv(os.path.join(directory, 'profile.csv'), index=False)
+
+
+def memory_mb(field):
+    # ru_maxrss survives fork/exec on Linux, so read this process's own counters
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+
+
+def load(mode, directory):
+    import pandas as pd
+    from doc_store import load_table
+
+    start = time.perf_counter()
+    paths = [os.path.join(directory, name) for name in ('alias.csv', 'sentence.csv', 'profile.csv')]
+    kwargs = [{}, {'dtype': {'id': str, 'prison_sentence': float}}, {'dtype': {'id': str}}]
+    if mode == 'csv':
+        frames = [pd.read_csv(path, **kw) for path, kw in zip(paths, kwargs)]
+    else:
+        frames = [load_table(path, store_dir=os.path.join(directory, '.columnar'), **kw) for path, kw in zip(paths, kwargs)]
+    elapsed = time.perf_counter() - start
+    # The frames stay referenced until after the RSS reading, so it counts them
+    rows = sum(len(frame) for frame in frames)
+    print(f'{mode:<10}{rows:>10} rows{elapsed:8.2f} s{memory_mb("VmRSS"):10.0f} MB RSS{memory_mb("VmHWM"):10.0f} MB peak')
+
+
+def main():
+    if sys.argv[1:2] == ['--load']:
+        return load(sys.argv[2], sys.argv[3])
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        write_csvs(directory, n_rows)
+        for mode in ('csv', 'columnar', 'columnar'):  # the first columnar run builds the file
+            subprocess.run([sys.executable, __file__, '--load', mode, directory], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Check parse_docket against the old pd.read_html path and time both.
+
+    python benchmarks/bench_docket_parser.py [n_pages]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from benchmarks.synthetic import docket_page
+from docket_parser import parse_docket
+
+
+def read_html_docket_table(soup):
+    # The previous extract_docket_table, kept here as the reference
+    tables = soup.select("table.docketlist.ocis, table.docketlist.kp")
+    dataframes = []
+    for table in tables:
+        try:
+            df = pd.read_html(str(table))[0]
+            dataframes.append(df)
+        except:
+            pass
+    fee_table = pd.concat(dataframes)
+    fee_table.columns = [col.lower() for col in fee_table.columns]
+    fee_table['date'] = fee_table['date'].fillna(method='ffill')
+    default_amount = ""
+    fee_table['amount'].fillna(default_amount, inplace=True)
+
+    return fee_table
+
+
+def typed(fee_table):
+    # Apply the typing parse_docket does to the reference output
+    fee_table = fee_table.reset_index(drop=True)
+    fee_table['date'] = pd.to_datetime(fee_table['date'])
+    fee_table['count'] = pd.to_numeric(fee_table['count'], errors='coerce')
+    fee_table['amount'] = pd.to_numeric(fee_table['amount'].astype(str).str.replace('[ ,$]', '', regex=True),
+                                        errors='coerce').astype(float)
+    for column in ('code', 'description', 'party'):
+        fee_table[column] = fee_table[column].astype(object).where(fee_table[column].notna(), None)
+    return fee_table
+
+
+def corpus(n_pages):
+    pages = []
+    for i in range(n_pages):
+        page = docket_page(f'CF-2012-{i}', n_rows=50 + 20 * (i % 10), seed=i, table_class=('ocis', 'kp')[i % 2])
+        if i % 3 == 0:  # some dockets carry both an ocis and a kp table
+            extra = docket_page(f'CF-2012-{i}', n_rows=10, seed=-i, table_class='kp')
+            page = page.replace('</body>', extra[extra.index('<table class="docketlist'):])
+        pages.append(page.encode())
+    return pages
+
+
+def main():
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    pages = corpus(n_pages)
+
+    start = time.perf_counter()
+    reference = [read_html_docket_table(BeautifulSoup(page, 'html.parser')) for page in pages]
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parsed = [parse_docket(page) for page in pages]
+    parsed_time = time.perf_counter() - start
+
+    for old, new in zip(reference, parsed):
+        pd.testing.assert_frame_equal(typed(old), new, check_dtype=False)
+
+    print(f'{n_pages} pages, outputs match')
+    print(f'BeautifulSoup + pd.read_html: {reference_time / n_pages * 1000:8.2f} ms/page')
+    print(f'parse_docket (lxml):          {parsed_time / n_pages * 1000:8.2f} ms/page')
+    print(f'speedup: {reference_time / parsed_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
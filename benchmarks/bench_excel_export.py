@@ -0,0 +1,223 @@
+"""Check the streaming Excel export against the old pd.ExcelWriter path and time both.
+
+    python benchmarks/bench_excel_export.py [n_cases]
+
+Builds a synthetic client with `n_cases` cases (default 500), compares
+every cell value and its format in the two workbooks, and reports wall
+time and peak traced memory.
+"""
+import os
+import re
+import sys
+import time
+import tracemalloc
+import zipfile
+from io import BytesIO
+from xml.etree import ElementTree
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+
+from benchmarks.synthetic import docket_page
+from data_processing import extract_and_calculate
+from docket_parser import parse_docket
+from streaks import payment_streak
+from utils import generate_excel_content, summarize_results
+
+NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+N_DISTINCT_DOCKETS = 25
+
+
+def as_tuple(result):
+    # The 9-tuple extract_and_calculate used to return, for the reference below
+    return (result.streak_length, result.total_paid_months, result.streak_end, result.total_amount_paid,
+            result.total_amount_owed, result.has_payment_plan, result.already_received_waiver,
+            result.fee_table_paid, result.fee_table_issued)
+
+
+def pandas_excel_content(results, summary, case_list, url_list):
+    # The previous generate_excel_content, kept here as the reference
+    output = BytesIO()
+
+    # Create a summary DataFrame
+    summary_df = pd.DataFrame(
+        data=summary,
+        index=[0],
+        columns=['Total Cases Searched', 'Total Fees Issued', 'Total Fees Paid', 'Total Months Paid',
+                 'Max Consecutive Months Paid - Individual']
+    )
+
+    # Initialize DataFrames for combined fee_table_paid and individual case summaries
+    combined_fee_table_paid = pd.DataFrame()
+    individual_case_summaries = pd.DataFrame()
+
+    # Save individual case information to separate sheets and update combined_fee_table_paid
+    for case_number, result in results.items():
+        url_index = case_list.index(case_number)
+        url = url_list[url_index]
+        streak_length, total_paid_months, _, total_amount_paid, total_amount_owed, _, _, fee_table_paid, fee_table_issued = as_tuple(result)
+        receipts_table = None
+
+        # Create a DataFrame with the individual case information (topline)
+        case_info_df = pd.DataFrame(
+            data={
+                'Case Number': [case_number],
+                'URL': [url],
+                'Total Amount Owed': [total_amount_owed],
+                'Total Amount Paid': [total_amount_paid],
+                'Streak Length': [streak_length],
+                'Total Paid Months': [total_paid_months]
+            }
+        )
+
+        # Append individual case summary to the DataFrame
+        individual_case_summaries = pd.concat([individual_case_summaries, case_info_df], ignore_index=True)
+
+        # Append fee_table_paid to the combined DataFrame
+        if fee_table_paid is not None:
+            combined_fee_table_paid = pd.concat([combined_fee_table_paid, fee_table_paid], ignore_index=True)
+
+    # Calculate the longest streak for the combined fee_table_paid
+    if 'date' in combined_fee_table_paid.columns:
+        max_combined_streak, _, _, _ = payment_streak(combined_fee_table_paid['date'])
+    else:
+        max_combined_streak = 0
+    summary_df['Max Consecutive Months Paid - All'] = max_combined_streak
+
+    # Save summary DataFrame, individual_case_summaries, and combined_fee_table_paid to the first sheet
+    with pd.ExcelWriter(output, engine='xlsxwriter', date_format='mm-dd-yyyy', datetime_format='mm-dd-yyyy') as writer:
+        summary_df.to_excel(writer, sheet_name='Summary', index=False)
+        individual_case_summaries.to_excel(writer, sheet_name='Summary', index=False, startrow=len(summary_df) + 1)
+
+        combined_fee_table_paid['date'] = pd.to_datetime(combined_fee_table_paid['date'])
+        combined_fee_table_paid = combined_fee_table_paid.sort_values(by='date')
+        combined_fee_table_paid['date'] = combined_fee_table_paid['date'].dt.strftime('%m-%d-%Y')
+        combined_fee_table_paid.reset_index(drop=True, inplace=True)
+        combined_fee_table_paid.to_excel(writer, sheet_name='Summary', index=True,
+                                         startrow=len(summary_df) + len(individual_case_summaries) + 3)
+
+        # Save individual case information to separate sheets
+        for case_number, result in results.items():
+            url_index = case_list.index(case_number)
+            url = url_list[url_index]
+            streak_length, total_paid_months, _, total_amount_paid, total_amount_owed, _, _, fee_table_paid, fee_table_issued = as_tuple(result)
+            receipts_table = None
+
+                # Create a DataFrame with the individual case information (topline)
+            case_info_df = pd.DataFrame(
+                data={
+                    'Case Number': [case_number],
+                    'URL': [url],
+                    'Total Amount Owed': [total_amount_owed],
+                    'Total Amount Paid': [total_amount_paid],
+                    'Streak Length': [streak_length],
+                    'Total Paid Months': [total_paid_months]
+                }
+            )
+
+            # Save the individual case information to a new sheet
+            case_info_df.to_excel(writer, sheet_name=f'Case {case_number}', index=False, startrow=0)
+
+            # Save fee_table_paid, fee_table_issued, and receipts_table to the same sheet
+            worksheet = writer.sheets[f'Case {case_number}']
+
+            if fee_table_paid is not None:
+                fee_table_paid.to_excel(writer, sheet_name=f'Case {case_number}', index=False, startrow=5)
+                worksheet.write(4, 0, 'Fee Table Paid')
+            if fee_table_issued is not None:
+                fee_table_issued.to_excel(writer, sheet_name=f'Case {case_number}', index=False, startrow=5,
+                                          startcol=fee_table_paid.shape[1] + 1)
+                worksheet.write(4, fee_table_paid.shape[1] + 1, 'Fee Table Issued')
+            if receipts_table is not None:
+                startcol = fee_table_paid.shape[1] + fee_table_issued.shape[1] + 2
+                receipts_table.to_excel(writer, sheet_name=f'Case {case_number}', index=False, startrow=5,
+                                        startcol=startcol)
+                worksheet.write(4, startcol, 'Receipts Table')
+
+    output.seek(0)
+    return output
+
+
+def synthetic_client(n_cases):
+    # A handful of distinct dockets reused under different case numbers
+    tables = [parse_docket(docket_page(f'CF-2012-{i}', n_rows=50 + 20 * (i % 10), seed=i).encode())
+              for i in range(N_DISTINCT_DOCKETS)]
+    case_list = [f'CF-{2000 + i // 1000}-{i % 1000}' for i in range(n_cases)]
+    url_list = [f'https://www.oscn.net/dockets/GetCaseInformation.aspx?db=tulsa&number={case}' for case in case_list]
+    results = {case: extract_and_calculate(tables[i % len(tables)], 'john', 'doe', case)
+               for i, case in enumerate(case_list)}
+    summary = summarize_results(results)
+    results = dict(sorted(results.items(), key=lambda item: item[1].streak_length, reverse=True))
+    return results, summary, case_list, url_list
+
+
+def read_cells(content):
+    """{sheet: {cell reference: (value, format)}} from an .xlsx, formats resolved to their XML."""
+    with zipfile.ZipFile(BytesIO(content)) as book:
+        names = book.namelist()
+        shared = []
+        if 'xl/sharedStrings.xml' in names:
+            shared = [''.join(si.itertext()) for si in
+                      ElementTree.fromstring(book.read('xl/sharedStrings.xml')).findall('m:si', NS)]
+        styles = ElementTree.fromstring(book.read('xl/styles.xml'))
+        parts = {tag: [ElementTree.tostring(e) for e in styles.find(f'm:{tag}s', NS) or []]
+                 for tag in ('font', 'border', 'fill')}
+        number_formats = {e.get('numFmtId'): e.get('formatCode') for e in styles.iterfind('m:numFmts/m:numFmt', NS)}
+        formats = []
+        for xf in styles.find('m:cellXfs', NS):
+            alignment = xf.find('m:alignment', NS)
+            formats.append((parts['font'][int(xf.get('fontId', 0))], parts['border'][int(xf.get('borderId', 0))],
+                            number_formats.get(xf.get('numFmtId'), xf.get('numFmtId')),
+                            None if alignment is None else tuple(sorted(alignment.attrib.items()))))
+
+        workbook = ElementTree.fromstring(book.read('xl/workbook.xml'))
+        sheets = {}
+        for i, sheet in enumerate(workbook.iterfind('m:sheets/m:sheet', NS), start=1):
+            cells = {}
+            root = ElementTree.fromstring(book.read(f'xl/worksheets/sheet{i}.xml'))
+            for c in root.iterfind('.//m:c', NS):
+                kind = c.get('t')
+                if kind == 's':
+                    value = shared[int(c.find('m:v', NS).text)]
+                elif kind == 'inlineStr':
+                    value = ''.join(c.find('m:is', NS).itertext())
+                else:
+                    v = c.find('m:v', NS)
+                    value = None if v is None else v.text
+                cells[c.get('r')] = (value, formats[int(c.get('s', 0))])
+            links = [re.sub(r' r:id="[^"]*"', '', ElementTree.tostring(h).decode())
+                     for h in root.iterfind('.//m:hyperlink', NS)]
+            sheets[sheet.get('name')] = (cells, links)
+        return sheets
+
+
+def measure(build, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    content = build(*args).getvalue()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return content, elapsed, peak
+
+
+def main():
+    n_cases = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    client = synthetic_client(n_cases)
+
+    reference, reference_time, reference_peak = measure(pandas_excel_content, *client)
+    streamed, streamed_time, streamed_peak = measure(generate_excel_content, *client)
+
+    expected, actual = read_cells(reference), read_cells(streamed)
+    assert list(expected) == list(actual), 'sheet names differ'
+    for name in expected:
+        assert expected[name] == actual[name], f'sheet {name!r} differs'
+
+    print(f'{n_cases} cases, {len(expected)} sheets, workbooks match')
+    print(f'pd.ExcelWriter:           {reference_time:7.2f} s  peak {reference_peak / 2**20:7.1f} MB')
+    print(f'streaming constant_memory: {streamed_time:7.2f} s  peak {streamed_peak / 2**20:7.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Per-case memory of the search results HTML column: parsed soup vs packed bytes.
+
+    python benchmarks/bench_html_memory.py [n_cases]
+"""
+import os
+import pickle
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+
+from benchmarks.synthetic import docket_page
+from data_processing import pack_html
+
+
+def measure(n_cases, build):
+    tracemalloc.start()
+    column = [build(docket_page(f'CF-2012-{i}', seed=i).encode()) for i in range(n_cases)]
+    resident = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    pickled = len(pickle.dumps(column, protocol=pickle.HIGHEST_PROTOCOL))
+    return resident / n_cases, pickled / n_cases
+
+
+def main():
+    n_cases = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    sys.setrecursionlimit(100000)  # pickling deep soup trees
+    builds = {
+        'BeautifulSoup': lambda content: BeautifulSoup(content, 'html.parser'),
+        'raw bytes': lambda content: pack_html(content, compress=False),
+        'zlib bytes': pack_html,
+    }
+    print(f'{"HTML column":<15}{"resident/case":>16}{"pickled/case":>16}')
+    for name, build in builds.items():
+        resident, pickled = measure(n_cases, build)
+        print(f'{name:<15}{resident / 1024:>13.1f} KB{pickled / 1024:>13.1f} KB')
+
+
+if __name__ == '__main__':
+    main()
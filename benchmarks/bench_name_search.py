@@ -0,0 +1,74 @@
+"""Build size, latency and recall of the fuzzy alias name search.
+
+    python benchmarks/bench_name_search.py [n_rows]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import pandas as pd
+
+from doc_index import DocIndex
+from name_search import NameSearchIndex
+
+SYLLABLES = ['al', 'an', 'ar', 'be', 'bo', 'ca', 'da', 'de', 'el', 'en', 'er', 'ga', 'ha', 'is', 'jo', 'ka', 'la',
+             'le', 'li', 'ma', 'mi', 'na', 'ne', 'no', 'ra', 're', 'ri', 'ro', 'sa', 'se', 'son', 'ta', 'th', 'to',
+             'va', 'wil', 'ya', 'ton', 'ley', 'ez']
+
+
+def synthetic_names(n, rng, parts):
+    picks = rng.integers(0, len(SYLLABLES), (n, parts))
+    return [''.join(SYLLABLES[i] for i in row).upper() for row in picks]
+
+
+def misspell(name, rng):
+    i = int(rng.integers(0, len(name)))
+    edit = rng.integers(0, 3)
+    if edit == 0:
+        return name[:i] + name[i + 1:]
+    if edit == 1:
+        return name[:i] + 'e' + name[i + 1:]
+    return name[:max(3, len(name) - 2)]  # partial, as if still typing
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    lasts = synthetic_names(n_rows // 3, rng, 3)
+    firsts = synthetic_names(n_rows // 3, rng, 2)
+    picks = rng.integers(0, len(lasts), n_rows)
+    alias_df = pd.DataFrame({'id': picks, 'last_name': np.array(lasts)[picks], 'first_name': np.array(firsts)[picks]})
+    empty = pd.DataFrame({'id': pd.Series([], dtype=object)})
+
+    start = time.perf_counter()
+    doc_index = DocIndex(alias_df, empty, empty)
+    built = time.perf_counter()
+    search = doc_index.alias_search
+    print(f'{n_rows} alias rows, {len(search.names)} distinct names, build {built - start:.1f} s, '
+          f'search index {time.perf_counter() - built:.1f} s')
+
+    # The search index built again from the same names, to see the most it allocates on the way
+    tracemalloc.start()
+    NameSearchIndex(doc_index.alias_names.names)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'index size {search.nbytes / 2**20:.1f} MB, build peak {peak / 2**20:.1f} MB over the names')
+
+    timings, found = [], 0
+    for row in alias_df.sample(200, random_state=1).itertuples():
+        first, last = misspell(row.first_name, rng), misspell(row.last_name, rng)
+        start = time.perf_counter()
+        slots, _ = search.search(first, last, k=10)
+        timings.append(time.perf_counter() - start)
+        found += doc_index.alias_names.slots[f'{row.last_name.lower()}\x1f{row.first_name.lower()}'] in slots
+    timings = np.array(timings) * 1000
+    print(f'query p50 {np.percentile(timings, 50):.1f} ms, p95 {np.percentile(timings, 95):.1f} ms, '
+          f'recall@10 {found / len(timings):.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Time Step 4's calculation serially and in the process pool, and check they agree.
+
+    PARSE_WORKERS=4 python benchmarks/bench_process_urls.py [n_cases]
+
+Builds `n_cases` packed synthetic docket pages (default 200), runs
+calculate_cases over them both ways (bypassing process_urls' memo),
+compares every result, and reports wall time and cases per second. The
+pool is started and warmed before timing, as it is in a running app.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+
+from benchmarks.synthetic import docket_page
+from data_processing import PROCESS_WORKERS, calculate_cases, pack_html, process_pool
+
+FIELDS = ['streak_length', 'total_paid_months', 'streak_end', 'total_amount_paid', 'total_amount_owed',
+          'has_payment_plan', 'already_received_waiver']
+
+
+def synthetic_cases(n_cases):
+    cases = {}
+    for i in range(n_cases):
+        case_number = f'CF-2012-{i}'
+        page = docket_page(case_number, n_rows=50 + 20 * (i % 10), seed=i, table_class=('ocis', 'kp')[i % 2])
+        cases[case_number] = pack_html(page.encode())
+    return cases
+
+
+def same_result(a, b):
+    return (all(getattr(a, field) == getattr(b, field) for field in FIELDS)
+            and a.fee_table_paid.equals(b.fee_table_paid) and a.fee_table_issued.equals(b.fee_table_issued))
+
+
+def measure(cases, executor):
+    start = time.perf_counter()
+    results = calculate_cases(list(cases.items()), 'john', 'doe', executor=executor)
+    return dict(zip(cases, results)), time.perf_counter() - start
+
+
+def main():
+    n_cases = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    cases = synthetic_cases(n_cases)
+    print(f'{n_cases} cases, {sum(len(html) for html in cases.values()) / 2**20:.1f} MB packed, '
+          f'{PROCESS_WORKERS} workers')
+
+    # Start the workers and let them import everything before timing
+    list(process_pool().map(pd.isna, range(PROCESS_WORKERS * 2)))
+
+    serial, serial_s = measure(cases, executor=None)
+    pooled, pooled_s = measure(cases, executor=process_pool())
+    mismatched = [case for case in cases if not same_result(serial[case], pooled[case])]
+    assert not mismatched, f'results differ for {mismatched[:5]}'
+
+    for label, elapsed in (('serial', serial_s), ('process pool', pooled_s)):
+        print(f'{label:<14}{elapsed:>8.2f} s{n_cases / elapsed:>10.1f} cases/s')
+    print(f'speedup {serial_s / pooled_s:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
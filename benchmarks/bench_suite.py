@@ -0,0 +1,261 @@
+"""Time each parsing and calculation stage over a corpus of OSCN/ODCR pages.
+
+    python benchmarks/bench_suite.py run [--fixtures DIR] [--out FILE] [--repeat N]
+    python benchmarks/bench_suite.py compare BASELINE.json CANDIDATE.json
+    python benchmarks/bench_suite.py record KIND URL [URL ...]
+    python benchmarks/bench_suite.py synthesize
+
+The corpus lives in `benchmarks/fixtures/<kind>/*.html`, one directory per
+page kind (see KINDS). `record` saves live pages there. It is ignored by
+git because real dockets name real people. A kind with no recorded pages
+falls back to generated synthetic pages, and the JSON report says which
+kinds came from the fixtures directory.
+
+Every stage runs in isolation on inputs prepared beforehand. Timings are
+the best of `--repeat` runs, per page or per case. Peak memory comes from
+one extra run under tracemalloc, so tracing overhead does not skew the
+timings. `run` writes JSON, by default to
+benchmarks/results/<git revision>.json. `compare` prints the ratio of each
+stage between two reports.
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+
+from benchmarks.synthetic import docket_page, odcr_detail_page, odcr_search_page, results_page
+from data_processing import (extract_and_calculate, extract_docket_table, extract_fee_table, longest_streak,
+                             parse_case_results, update_amount_by_name)
+from odcr_details import parse_odcr_detail_fast
+from transport import shared_client
+from utils import generate_excel_content, parse_odcr_detail, summarize_results
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(HERE, 'fixtures')
+RESULTS_DIR = os.path.join(HERE, 'results')
+
+KINDS = ['oscn_results', 'oscn_docket', 'odcr_search', 'odcr_detail']
+CLIENT = ('john', 'doe')  # the party the synthetic pages are built around
+
+
+def synthetic_corpus(kind):
+    if kind == 'oscn_results':
+        return [results_page(n_cases=60 + 30 * i).encode() for i in range(5)]
+    if kind == 'oscn_docket':
+        pages = []
+        for i in range(40):
+            table_class = ('ocis', 'kp')[i % 2]
+            pages.append(docket_page(f'CF-2012-{i}', n_rows=50 + 20 * (i % 10), seed=i, table_class=table_class))
+        return [page.encode() for page in pages]
+    if kind == 'odcr_search':
+        return [odcr_search_page(n_cases=20 + 20 * i, seed=i).encode() for i in range(5)]
+    if kind == 'odcr_detail':
+        return [odcr_detail_page(n_receipts=10 + 10 * i, seed=i).encode() for i in range(20)]
+    raise ValueError(f'Unknown page kind {kind!r}')
+
+
+def load_corpus(fixtures_dir):
+    corpus = {}
+    for kind in KINDS:
+        paths = sorted(glob.glob(os.path.join(fixtures_dir, kind, '*.html')))
+        pages = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                pages.append((os.path.basename(path), f.read()))
+        if pages:
+            corpus[kind] = ('fixtures', pages)
+        else:
+            corpus[kind] = ('synthetic', [(f'{kind}-{i}', page) for i, page in enumerate(synthetic_corpus(kind))])
+    return corpus
+
+
+def case_number(name):
+    # Recorded dockets are saved under their case number; synthetic ones are numbered in order
+    name = os.path.splitext(name)[0]
+    return name if not name.startswith('oscn_docket-') else f'CF-2012-{name.rsplit("-", 1)[1]}'
+
+
+def prepare(corpus):
+    """Inputs for every stage, built outside the timed sections."""
+    dockets = corpus['oscn_docket'][1]
+    cases = [case_number(name) for name, _ in dockets]
+    tables = [extract_docket_table(page) for _, page in dockets]
+    results = {case: extract_and_calculate(table, *CLIENT, case) for case, table in zip(cases, tables)}
+    summary = summarize_results(results)
+    return {
+        'cases': cases,
+        'tables': tables,
+        'results': results,
+        'excel': (dict(sorted(results.items(), key=lambda item: item[1].streak_length, reverse=True)), summary, cases,
+                  [f'https://www.oscn.net/dockets/GetCaseInformation.aspx?number={case}' for case in cases]),
+        'odcr_search_soups': [BeautifulSoup(page, 'html.parser') for _, page in corpus['odcr_search'][1]],
+    }
+
+
+def stages(corpus, inputs):
+    """(name, unit, item count, function running the stage over the whole corpus once)."""
+    results_pages = [page for _, page in corpus['oscn_results'][1]]
+    dockets = [page for _, page in corpus['oscn_docket'][1]]
+    details = [page for _, page in corpus['odcr_detail'][1]]
+    cases, tables, results = inputs['cases'], inputs['tables'], inputs['results']
+    paid_tables = [result.fee_table_paid for result in results.values()]
+    return [
+        ('parse_case_results', 'page', len(results_pages),
+         lambda: [parse_case_results(page) for page in results_pages]),
+        ('extract_docket_table', 'page', len(dockets),
+         lambda: [extract_docket_table(page) for page in dockets]),
+        ('extract_and_calculate', 'case', len(tables),
+         lambda: [extract_and_calculate(table, *CLIENT, case) for case, table in zip(cases, tables)]),
+        # The name scan path, with the transfers not supplied up front
+        ('update_amount_by_name', 'case', len(tables),
+         lambda: [update_amount_by_name(table.copy(), *CLIENT, case) for case, table in zip(cases, tables)]),
+        ('longest_streak', 'case', len(paid_tables),
+         lambda: [longest_streak(table) for table in paid_tables]),
+        ('generate_excel_content', 'case', len(results),
+         lambda: generate_excel_content(*inputs['excel'])),
+        ('extract_fee_table', 'page', len(inputs['odcr_search_soups']),
+         lambda: [extract_fee_table(soup) for soup in inputs['odcr_search_soups']]),
+        ('parse_odcr_detail', 'page', len(details),
+         lambda: [parse_odcr_detail(page) for page in details]),
+        ('parse_odcr_detail_fast', 'page', len(details),
+         lambda: [parse_odcr_detail_fast(page) for page in details]),
+    ]
+
+
+def measure(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args):
+    corpus = load_corpus(args.fixtures)
+    inputs = prepare(corpus)
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'corpus': {kind: {'source': source, 'pages': len(pages), 'bytes': sum(len(page) for _, page in pages)}
+                   for kind, (source, pages) in corpus.items()},
+        'stages': {},
+    }
+
+    print(f'{"stage":<24}{"per item":>14}{"peak memory":>14}')
+    for name, unit, count, stage in stages(corpus, inputs):
+        best, peak = measure(stage, args.repeat)
+        report['stages'][name] = {
+            'unit': unit,
+            'items': count,
+            'total_s': best,
+            'ms_per_item': best / max(count, 1) * 1000,
+            'peak_kb': peak / 1024,
+        }
+        print(f'{name:<24}{best / max(count, 1) * 1000:>8.2f} ms/{unit:<4}{peak / 2**20:>11.1f} MB')
+
+    out = args.out or os.path.join(RESULTS_DIR, f'{report["revision"]}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {out}')
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    for kind, info in candidate['corpus'].items():
+        if baseline['corpus'].get(kind) != info:
+            print(f'warning: the {kind} corpus differs between the two runs')
+    print(f'{"stage":<24}{baseline["revision"]:>12}{candidate["revision"]:>12}{"ratio":>8}{"memory":>8}')
+    for name, new in candidate['stages'].items():
+        old = baseline['stages'].get(name)
+        if old is None:
+            print(f'{name:<24}{"-":>12}{new["ms_per_item"]:>10.2f}ms')
+            continue
+        print(f'{name:<24}{old["ms_per_item"]:>10.2f}ms{new["ms_per_item"]:>10.2f}ms'
+              f'{new["ms_per_item"] / old["ms_per_item"]:>7.2f}x{new["peak_kb"] / max(old["peak_kb"], 1):>7.2f}x')
+
+
+def record(args):
+    directory = os.path.join(args.fixtures, args.kind)
+    os.makedirs(directory, exist_ok=True)
+    headers = {'User-Agent': args.user_agent} if args.user_agent else {}
+    for url in args.urls:
+        response = shared_client().get(url, headers=headers)
+        response.raise_for_status()
+        # Dockets are named by case number so extract_and_calculate sees the real one
+        number = parse_qs(urlsplit(url).query).get('number')
+        name = number[0] if number else f'{args.kind}-{len(os.listdir(directory))}'
+        with open(os.path.join(directory, f'{name}.html'), 'wb') as f:
+            f.write(response.content)
+        print(f'Saved {url} as {args.kind}/{name}.html')
+
+
+def synthesize(args):
+    for kind in KINDS:
+        directory = os.path.join(args.fixtures, kind)
+        os.makedirs(directory, exist_ok=True)
+        for i, page in enumerate(synthetic_corpus(kind)):
+            with open(os.path.join(directory, f'{kind}-{i}.html'), 'wb') as f:
+                f.write(page)
+    print(f'Wrote the synthetic corpus to {args.fixtures}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='corpus directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='time every stage and write a JSON report')
+    run_parser.add_argument('--out', help='report path (default: benchmarks/results/<revision>.json)')
+    run_parser.add_argument('--repeat', type=int, default=5, help='timed runs per stage; the best is kept')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='compare two JSON reports')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.set_defaults(handler=compare)
+
+    record_parser = commands.add_parser('record', help='save live pages into the corpus')
+    record_parser.add_argument('kind', choices=KINDS)
+    record_parser.add_argument('urls', nargs='+')
+    record_parser.add_argument('--user-agent', help='User-Agent header, as the app sends for OSCN')
+    record_parser.set_defaults(handler=record)
+
+    synthesize_parser = commands.add_parser('synthesize', help='write the synthetic corpus as fixtures')
+    synthesize_parser.set_defaults(handler=synthesize)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
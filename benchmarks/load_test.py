@@ -0,0 +1,162 @@
+"""Load test the scraping layer against the replay server, at several concurrency settings.
+
+    python benchmarks/load_test.py [--concurrency 1 4 8 16] [--requests 200] [--rps 1000] [--out FILE]
+                                   [--base-url URL] [replay_server options: --latency S --jitter S ...]
+
+A replay server (see replay_server.py) is started in-process with the
+given latency, jitter and fault rates, unless `--base-url` names one
+already running. Each concurrency setting is measured two ways:
+
+- requests: `--requests` docket GETs through a RetryingClient from that
+  many threads, uncached and not rate limited. Reports requests per
+  second, latency percentiles (retries included), retries and failures.
+- end to end: the synthetic client's search, then a DocketLoader
+  downloading and calculating every docket as the app does, from an
+  empty HTTP cache and case memo, with `max_in_flight` set to the
+  concurrency and the per-host rate to `--rps`. Reports cases per second.
+
+The HTTP cache goes in a temporary directory, so the app's own is left
+alone. With `--out` the report is also written as JSON.
+"""
+import argparse
+import contextvars
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from benchmarks.replay_server import add_server_arguments, server_from_arguments
+
+CLIENT = ('john', 'doe')  # the party the synthetic pages are built around
+GUID = 'load-test'
+
+
+def latency_stats(latencies):
+    if not latencies:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    p50, p95, p99, worst = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99, 100])
+    return {'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': worst}
+
+
+def request_load(base_url, n_requests, concurrency):
+    import httpx
+    from timing import Trace, activate
+    from transport import RetryingClient
+
+    urls = [f'{base_url}/dockets/GetCaseInformation.aspx?db=tulsa&number=CF-2015-{i}' for i in range(n_requests)]
+    trace = activate(Trace())
+
+    def get(client, url):
+        start = time.perf_counter()
+        try:
+            status = client.get(url).status_code
+        except httpx.TransportError:
+            status = None
+        return time.perf_counter() - start, status
+
+    with RetryingClient() as client, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(contextvars.copy_context().run, get, client, url) for url in urls]
+        outcomes = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+    activate(None)
+
+    latencies = [latency for latency, status in outcomes if status == 200]
+    return {
+        'requests': n_requests,
+        'seconds': elapsed,
+        'requests_per_s': n_requests / elapsed,
+        **latency_stats(latencies),
+        'retries': trace.counters['retries'],
+        'failed': sum(status != 200 for _, status in outcomes),
+    }
+
+
+def end_to_end(concurrency, requests_per_second):
+    import data_processing
+    from data_processing import DocketLoader, run_case_search
+    from http_cache import default_cache
+    from timing import Trace, activate
+
+    default_cache().clear()
+    data_processing._case_memo.clear()
+    trace = activate(Trace())
+    start = time.perf_counter()
+    df = run_case_search(GUID, *CLIENT, requests_per_second=requests_per_second, fetch=False)
+    links_by_case = dict(zip(df['Case Number'], df['Link'])) if not df.empty else {}
+    loader = DocketLoader(GUID, *CLIENT, links_by_case, max_in_flight=concurrency,
+                          requests_per_second=requests_per_second)
+    dockets = loader.wait(list(links_by_case))
+    loader.close()
+    elapsed = time.perf_counter() - start
+    activate(None)
+
+    cases = len(dockets)
+    return {
+        'cases': cases,
+        'seconds': elapsed,
+        'cases_per_s': cases / elapsed,
+        'retries': trace.counters['retries'],
+        'bytes_downloaded': trace.counters['bytes_downloaded'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--requests', type=int, default=200, help='docket GETs per concurrency setting')
+    parser.add_argument('--rps', type=float, default=1000.0, help='per-host rate for the end to end runs')
+    parser.add_argument('--base-url', help='a replay server already running, e.g. http://127.0.0.1:8765')
+    parser.add_argument('--out', help='write the report here as JSON')
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = server_from_arguments(args).start()
+        base_url = server.url
+    base_url = base_url.rstrip('/')
+
+    # The scrapers read their base URLs and cache directory when imported, so
+    # they are only imported (in the functions above) once these are set
+    os.environ['OSCN_BASE_URL'] = f'{base_url}/dockets/'
+    os.environ['ODCR_BASE_URL'] = f'{base_url}/odcr/'
+    os.environ['HTTP_CACHE_DIR'] = tempfile.mkdtemp(prefix='load-test-cache-')
+
+    report = {
+        'base_url': base_url,
+        'server': {name: getattr(args, name) for name in ('latency', 'jitter', 'error_rate', 'throttle_rate',
+                                                           'retry_after', 'cases')} if server else None,
+        'levels': [],
+    }
+    print(f'{"concurrency":>11}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"retries":>9}{"failed":>8}'
+          f'{"cases/s":>9}{"e2e s":>8}')
+    try:
+        for concurrency in args.concurrency:
+            requests = request_load(base_url, args.requests, concurrency)
+            cases = end_to_end(concurrency, args.rps)
+            report['levels'].append({'concurrency': concurrency, 'requests': requests, 'end_to_end': cases})
+            print(f'{concurrency:>11}{requests["requests_per_s"]:>9.1f}{requests["p50_ms"] or 0:>9.1f}'
+                  f'{requests["p95_ms"] or 0:>9.1f}{requests["p99_ms"] or 0:>9.1f}'
+                  f'{requests["retries"] + cases["retries"]:>9}{requests["failed"]:>8}'
+                  f'{cases["cases_per_s"]:>9.1f}{cases["seconds"]:>8.2f}')
+    finally:
+        if server is not None:
+            report['server_stats'] = {str(key): value for key, value in server.stats.items()}
+            server.stop()
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Wrote {args.out}')
+
+
+if __name__ == '__main__':
+    main()
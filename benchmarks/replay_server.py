@@ -0,0 +1,230 @@
+"""Serve recorded or synthetic OSCN and ODCR pages locally, for load testing the scrapers.
+
+    python benchmarks/replay_server.py [--port 8765] [--latency S] [--jitter S] [--error-rate P]
+                                       [--throttle-rate P] [--retry-after S] [--cases N] [--seed N]
+
+Point the app, batch.py or load_test.py at it with
+
+    OSCN_BASE_URL=http://127.0.0.1:8765/dockets/ ODCR_BASE_URL=http://127.0.0.1:8765/odcr/
+
+Routes, matched without regard to case:
+
+    /dockets/Results.aspx             an oscn_results page
+    /dockets/GetCaseInformation.aspx  an oscn_docket page, the one recorded for `number` if there is one
+    /odcr/                            an ODCR search form, as search_cases_http expects
+    /odcr/search                      an odcr_search page (GET or POST)
+    /odcr/detail                      an odcr_detail page
+
+Pages come from `benchmarks/fixtures/<kind>/*.html`, as bench_suite
+records them, and a kind with no recorded pages is served synthetic ones
+(`--cases` sets how many cases their search results list). When a kind
+has several pages, the query picks one by hash, so a URL always gets the
+same page.
+
+Every response waits `--latency` seconds, give or take up to `--jitter`.
+Then a `--throttle-rate` fraction of requests are answered 429 with a
+Retry-After of `--retry-after` seconds, and an `--error-rate` fraction
+503, as an overloaded court site would.
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.synthetic import docket_page, odcr_detail_page, odcr_search_page, results_page
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(HERE, 'fixtures')
+
+# Page kinds, laid out as bench_suite records them
+KINDS = ['oscn_results', 'oscn_docket', 'odcr_search', 'odcr_detail']
+
+ODCR_FORM = (b'<html><body><form action="search" method="post"><input type="text" id="search-party" name="party">'
+             b'<input type="submit" name="submit" value="Search for cases"></form></body></html>')
+
+
+def synthetic_pages(kind, n_cases=60):
+    if kind == 'oscn_results':
+        return {'results': results_page(n_cases=n_cases).encode()}
+    if kind == 'oscn_docket':
+        return {f'CF-2012-{i}': docket_page(f'CF-2012-{i}', n_rows=50 + 20 * (i % 10), seed=i,
+                                            table_class=('ocis', 'kp')[i % 2]).encode() for i in range(20)}
+    if kind == 'odcr_search':
+        return {'search': odcr_search_page(n_cases=n_cases).encode()}
+    if kind == 'odcr_detail':
+        return {f'detail-{i}': odcr_detail_page(n_receipts=10 + 10 * (i % 5), seed=i).encode() for i in range(20)}
+    raise ValueError(f'Unknown page kind {kind!r}')
+
+
+def load_pages(fixtures_dir=FIXTURES_DIR, n_cases=60):
+    """`{kind: {name: page}}` from the fixtures, with synthetic pages for kinds that have none recorded."""
+    pages = {}
+    for kind in KINDS:
+        recorded = {}
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, kind, '*.html'))):
+            with open(path, 'rb') as f:
+                recorded[os.path.splitext(os.path.basename(path))[0]] = f.read()
+        pages[kind] = recorded or synthetic_pages(kind, n_cases)
+    return pages
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients keep their connections alive, as they do with the court sites
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle holds the body for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.respond(parse_qs(urlsplit(self.path).query))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.respond(parse_qs(body.decode('latin-1')))
+
+    def respond(self, params):
+        time.sleep(self.server.delay())
+        status, body, headers = self.server.fault() or self.server.page(urlsplit(self.path).path.lower(), params)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.record(status, len(body))
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """A threaded HTTP server answering OSCN and ODCR URLs from `pages` (see load_pages).
+
+    `stats` counts the responses sent by status code, and their bytes.
+    Use `start()` to serve from a background thread, or `serve_forever()`.
+    """
+
+    daemon_threads = True
+    # socketserver's listen backlog of 5 drops connections when many clients open them at once
+    request_queue_size = 128
+
+    def __init__(self, pages, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=1.0, seed=None):
+        super().__init__((host, port), ReplayHandler)
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'bytes': 0}
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def delay(self):
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def fault(self):
+        # (status, body, headers) for a throttled or failed request, or None to serve the page
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429, b'Too Many Requests', {'Retry-After': f'{self.retry_after:g}'}
+        if roll < self.throttle_rate + self.error_rate:
+            return 503, b'Service Unavailable', {}
+        return None
+
+    def pick(self, kind, key):
+        pages = self.pages[kind]
+        names = list(pages)
+        return pages[names[zlib.crc32(key.encode()) % len(names)]]
+
+    def page(self, path, params):
+        def param(name):
+            return params.get(name, [''])[0]
+
+        if path.endswith('/results.aspx'):
+            body = self.pick('oscn_results', '|'.join(param(name) for name in ('lname', 'fname', 'mname')))
+        elif path.endswith('/getcaseinformation.aspx'):
+            body = self.pages['oscn_docket'].get(param('number')) or self.pick('oscn_docket', param('number'))
+        elif path in ('/odcr', '/odcr/'):
+            body = ODCR_FORM
+        elif path == '/odcr/search':
+            body = self.pick('odcr_search', param('party'))
+        elif path == '/odcr/detail':
+            body = self.pick('odcr_detail', param('casekey'))
+        else:
+            return 404, b'Not Found', {}
+        return 200, body, {'Content-Type': 'text/html; charset=utf-8'}
+
+    def record(self, status, size):
+        with self.lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+            self.stats['bytes'] += size
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='corpus directory')
+    parser.add_argument('--cases', type=int, default=60, help='cases in synthetic search results')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds before every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='latency varies by up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered 503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds on a 429')
+    parser.add_argument('--seed', type=int, help='seed for latency and faults')
+
+
+def server_from_arguments(args, port=0):
+    return ReplayServer(load_pages(args.fixtures, args.cases), port=port, latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate, throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+                        seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_arguments(args, args.port)
+    print(f'Serving on {server.url}')
+    print(f'OSCN_BASE_URL={server.url}/dockets/ ODCR_BASE_URL={server.url}/odcr/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
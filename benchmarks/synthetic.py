@@ -0,0 +1,97 @@
+"""Synthetic OSCN pages shaped like the real ones, for benchmarks."""
+import random
+from datetime import date, timedelta
+
+BOILERPLATE = (
+    '<div id="oscn-header"><ul class="nav">' + ''.join(f'<li><a href="/link{i}">Menu item {i}</a></li>' for i in range(60))
+    + '</ul></div><div class="notice"><p>' + 'The information on this site is provided as a public service. ' * 40
+    + '</p></div>'
+)
+
+FEE_CODES = ['ACCOUNT', 'PAY', 'TEXT', 'ACCOUNT', 'PAY', 'CTFREE', 'DISPCDAR', 'AC01', 'AC09', 'OCISR', 'SFAC']
+
+
+def docket_rows(case_number, n_rows, party, rng):
+    day = date(2012, 1, 3)
+    rows = []
+    for i in range(n_rows):
+        new_day = i == 0 or rng.random() < 0.6
+        if new_day:
+            day += timedelta(days=rng.randint(1, 45))
+        code = rng.choice(FEE_CODES)
+        amount = ''
+        if code in ('ACCOUNT', 'PAY'):
+            paid = rng.randint(5, 150)
+            description = (f'RECEIPT # {day.year}-{1000000 + i} ON {day:%m/%d/%Y}.<br/>PAYOR: {party} TOTAL AMOUNT '
+                           f'PAID: $ {paid}.00.<br/>LINE ITEMS:<br/>{case_number}: ${paid}.00 ON AC01 CLERK FEES.')
+        elif code == 'TEXT':
+            description = 'DEFENDANT TO PAY $50.00 PER MONTH PAYMENT PLAN BEGINNING NEXT MONTH.'
+        else:
+            description = f'COURT COSTS AND FEES [ $ {rng.randint(10, 400)}.00 ] ASSESSED AGAINST {party}'
+            amount = f'$ {rng.randint(10, 400)}.00'
+        rows.append(
+            f'<tr class="docketRow"><td class="date">{day:%m-%d-%Y}</td>' if new_day else
+            '<tr class="docketRow"><td class="date"></td>'
+        )
+        rows.append(
+            f'<td class="code">{code}</td><td class="description"><p>{description}</p></td>'
+            f'<td class="count">{rng.choice(["", "1"])}</td><td class="party">{party if amount else ""}</td>'
+            f'<td class="amount">{amount}</td></tr>'
+        )
+    return ''.join(rows)
+
+
+def docket_page(case_number='CF-2012-100', n_rows=150, party='DOE, JOHN', seed=0, table_class='ocis'):
+    rng = random.Random(seed)
+    header = ('<thead><tr><th>Date</th><th>Code</th><th>Description</th><th>Count</th><th>Party</th>'
+              '<th>Amount</th></tr></thead>')
+    return (
+        f'<html><head><title>{case_number}</title></head><body>{BOILERPLATE}'
+        f'<h2>{case_number}</h2><table class="docketlist {table_class}">{header}<tbody>'
+        f'{docket_rows(case_number, n_rows, party, rng)}</tbody></table>{BOILERPLATE}</body></html>'
+    )
+
+
+def results_page(n_cases=150, party='DOE, JOHN', counties=('TULSA', 'OKLAHOMA', 'CLEVELAND')):
+    tables = []
+    per_county = max(n_cases // len(counties), 1)
+    for c, county in enumerate(counties):
+        rows = ''.join(
+            f'<tr class="resultTableRow"><td><a href="GetCaseInformation.aspx?db={county.lower()}&amp;'
+            f'number=CF-2015-{c * per_county + i}">CF-2015-{c * per_county + i}</a></td><td>01/02/2015</td>'
+            f'<td>State of Oklahoma v. {party.title()}</td><td>{party}</td></tr>'
+            for i in range(per_county)
+        )
+        tables.append(f'<table class="caseCourtTable"><caption class="caseCourtHeader">{county} COUNTY COURT '
+                      f'Found {per_county} Records</caption>{rows}</table>')
+    return f'<html><body>{BOILERPLATE}{"".join(tables)}</body></html>'
+
+
+def odcr_search_page(n_cases=60, party='DOE, JOHN', seed=0):
+    rng = random.Random(seed)
+    rows = ''.join(
+        f'<tr><td><a href="detail?court=050-&amp;casekey=050-CF++12+++{1000 + i}">CF-2012-{1000 + i}</a></td>'
+        f'<td>{rng.choice(["TULSA", "OKLAHOMA", "CLEVELAND"])}</td><td>{party}</td>'
+        f'<td>{date(2012, 1, 3) + timedelta(days=rng.randint(0, 3000)):%m/%d/%Y}</td></tr>'
+        for i in range(n_cases)
+    )
+    return (f'<html><body>{BOILERPLATE}<table id="results-list-1"><tr><th>Case</th><th>Court</th><th>Party</th>'
+            f'<th>Filed</th></tr>{rows}</table>{BOILERPLATE}</body></html>')
+
+
+def odcr_detail_page(n_receipts=40, seed=0):
+    rng = random.Random(seed)
+    day = date(2012, 1, 3)
+    rows = []
+    total = 0
+    for i in range(n_receipts):
+        day += timedelta(days=rng.randint(10, 60))
+        paid = rng.randint(5, 150)
+        total += paid
+        rows.append(f'<tr><td>{day:%m/%d/%Y}</td><td>{day.year}-{1000000 + i}</td><td>${paid}.00</td></tr>')
+    return (
+        f'<html><body>{BOILERPLATE}<table><tr><th>Amount Owed</th><td>${rng.randint(100, 3000)}.00 as of today</td>'
+        f'</tr></table><section id="receipts"><table><thead><tr><th>Date</th><th>Receipt</th><th>Amount</th></tr>'
+        f'</thead><tbody>{"".join(rows)}<tr><td></td><td>Total</td><td>${total}.00</td></tr></tbody></table>'
+        f'</section>{BOILERPLATE}</body></html>'
+    )
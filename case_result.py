@@ -0,0 +1,162 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+MISSING = np.iinfo(np.int64).min  # cents with no value
+MISSING_32 = np.iinfo(np.int32).min  # counts and dates with no value
+
+
+def _codes(values):
+    # Repeated short strings (fee codes, party names) as int32 codes into a tuple of distinct values
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    return codes.astype(np.int8 if len(uniques) < 127 else np.int32), tuple(uniques)
+
+
+def _decode(codes, uniques):
+    values = np.empty(len(codes), dtype=object)
+    present = codes >= 0
+    values[present] = np.asarray(uniques, dtype=object)[codes[present]]
+    return values
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _pack_strings(values):
+    # Free text as one compressed UTF-8 blob with offsets, instead of a Python object per row.
+    # Docket descriptions repeat a lot of boilerplate, so the blob compresses well.
+    missing = tuple(i for i, value in enumerate(values) if _is_missing(value))
+    encoded = [str(value).encode() if not _is_missing(value) else b'' for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return zlib.compress(b''.join(encoded)), offsets, missing
+
+
+def _unpack_strings(blob, offsets, missing):
+    blob = zlib.decompress(blob)
+    values = np.array([blob[start:end].decode() for start, end in zip(offsets[:-1], offsets[1:])], dtype=object)
+    values[list(missing)] = None
+    return values
+
+
+def _to_int(values, scale=1, dtype=np.int64, missing=MISSING):
+    values = np.asarray(values, dtype=float)
+    ints = np.full(len(values), missing, dtype=dtype)
+    present = ~np.isnan(values)
+    ints[present] = np.round(values[present] * scale).astype(dtype)
+    return ints
+
+
+def _to_float(ints, scale=1, missing=MISSING):
+    values = ints.astype(float) / scale
+    values[ints == missing] = np.nan
+    return values
+
+
+def _to_days(dates):
+    dates = pd.to_datetime(dates).to_numpy(dtype='datetime64[D]')
+    days = dates.astype(np.int64)
+    days[np.isnat(dates)] = MISSING_32
+    return days.astype(np.int32)
+
+
+def _from_days(days):
+    dates = days.astype('datetime64[D]').astype('datetime64[ns]')
+    dates[days == MISSING_32] = np.datetime64('NaT')
+    return dates
+
+
+class Ledger:
+    """A fee table (date, code, description, count, party, amount) held as compact arrays.
+
+    Dates are int32 days, amounts int64 cents, counts int32, codes and
+    parties small int codes into their distinct values, and descriptions a
+    single compressed UTF-8 blob with offsets. The index is kept only when
+    it is not 0..n-1. `to_frame()` rebuilds the DataFrame for display or
+    export.
+    """
+
+    __slots__ = ('index', 'dates', 'code_codes', 'code_values', 'description_blob', 'description_offsets',
+                 'description_missing', 'counts', 'party_codes', 'party_values', 'cents')
+
+    def __init__(self, fee_table):
+        index = fee_table.index.to_numpy(dtype=np.int64)
+        self.index = None if np.array_equal(index, np.arange(len(index))) else index.astype(np.int32)
+        self.dates = _to_days(fee_table['date'])
+        self.code_codes, self.code_values = _codes(fee_table['code'])
+        self.description_blob, self.description_offsets, self.description_missing = \
+            _pack_strings(fee_table['description'].tolist())
+        self.counts = _to_int(pd.to_numeric(fee_table['count'], errors='coerce'), dtype=np.int32, missing=MISSING_32)
+        self.party_codes, self.party_values = _codes(fee_table['party'])
+        self.cents = _to_int(fee_table['amount'], scale=100)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def nbytes(self):
+        arrays = (self.dates, self.code_codes, self.description_offsets, self.counts, self.party_codes, self.cents)
+        return (sum(a.nbytes for a in arrays) + len(self.description_blob)
+                + (self.index.nbytes if self.index is not None else 0)
+                + sum(len(value) for value in self.code_values + self.party_values if isinstance(value, str)))
+
+    @property
+    def amounts(self):
+        return _to_float(self.cents, scale=100)
+
+    @property
+    def datetimes(self):
+        return _from_days(self.dates)
+
+    def columns(self):
+        """The fee table's columns as arrays, by name, in table order."""
+        return {
+            'date': self.datetimes,
+            'code': _decode(self.code_codes, self.code_values),
+            'description': _unpack_strings(self.description_blob, self.description_offsets,
+                                           self.description_missing),
+            'count': _to_float(self.counts, missing=MISSING_32),
+            'party': _decode(self.party_codes, self.party_values),
+            'amount': self.amounts,
+        }
+
+    def to_frame(self):
+        return pd.DataFrame(self.columns(), index=pd.Index(self.index) if self.index is not None else None)
+
+
+class CaseResult:
+    """What extract_and_calculate works out for one case.
+
+    The paid and issued fee tables are kept as Ledgers; `fee_table_paid` and
+    `fee_table_issued` build DataFrames from them each time they are read.
+    """
+
+    __slots__ = ('streak_length', 'total_paid_months', 'streak_end', 'total_amount_paid', 'total_amount_owed',
+                 'has_payment_plan', 'already_received_waiver', 'paid', 'issued')
+
+    def __init__(self, streak_length, total_paid_months, streak_end, total_amount_paid, total_amount_owed,
+                 has_payment_plan, already_received_waiver, fee_table_paid, fee_table_issued):
+        self.streak_length = streak_length
+        self.total_paid_months = total_paid_months
+        self.streak_end = streak_end
+        self.total_amount_paid = total_amount_paid
+        self.total_amount_owed = total_amount_owed
+        self.has_payment_plan = has_payment_plan
+        self.already_received_waiver = already_received_waiver
+        self.paid = Ledger(fee_table_paid)
+        self.issued = Ledger(fee_table_issued)
+
+    def __repr__(self):
+        return (f'CaseResult(streak_length={self.streak_length}, total_paid_months={self.total_paid_months}, '
+                f'total_amount_paid={self.total_amount_paid}, total_amount_owed={self.total_amount_owed}, '
+                f'paid={len(self.paid)} rows, issued={len(self.issued)} rows)')
+
+    @property
+    def fee_table_paid(self):
+        return self.paid.to_frame()
+
+    @property
+    def fee_table_issued(self):
+        return self.issued.to_frame()
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+import pandas as pd
+
+from data_processing import classify_ledger, extract_docket_table, summarize_ledger, unpack_html, with_case
+from timing import map_traced, span
+
+STATE_PATH = os.environ.get("CASE_STATE_PATH", os.path.join(".cache", "cases.sqlite"))
+# Bumped whenever the record layout or the result type changes; older records are recomputed
+STATE_VERSION = 2
+
+UNCHANGED, APPENDED, RECOMPUTED, NEW = 'unchanged', 'appended', 'recomputed', 'new'
+
+
+def case_key(case_number, first_name, last_name):
+    # Results depend on whose fees are being counted, not just the docket
+    return f'{case_number}|{last_name.strip().lower()}|{first_name.strip().lower()}'
+
+
+def table_digest(row_hashes):
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+
+def refresh_case(record, case_number, html, first_name, last_name):
+    """Bring one case's calculation up to date with a freshly fetched docket page.
+
+    `record` is the state saved by the previous run (or None). Returns
+    `(result, record, status)`: the extract_and_calculate outputs, the state
+    to save, and how the result was reached. An identical page or docket
+    table reuses the saved result. When the saved rows are still the
+    leading rows of the docket, only the rows after them are parsed for
+    fields and appended to the saved ledger before the totals and streaks
+    are recalculated; any other change recomputes the case. Pure, so it
+    can run in a worker process.
+    """
+    with span('case', case=case_number):
+        try:
+            return _refresh_case(record, case_number, html, first_name, last_name)
+        except Exception as e:
+            raise with_case(case_number, e) from e
+
+
+def _refresh_case(record, case_number, html, first_name, last_name):
+    page = unpack_html(html)
+    page_bytes = page.encode() if isinstance(page, str) else page
+    page_digest = hashlib.sha256(page_bytes).hexdigest()
+    if record is not None and record['page_digest'] == page_digest:
+        return record['result'], record, UNCHANGED
+
+    table = extract_docket_table(page)
+    row_hashes = pd.util.hash_pandas_object(table, index=False).to_numpy()
+    digest = table_digest(row_hashes)
+    if record is not None and record['table_digest'] == digest:
+        return record['result'], dict(record, page_digest=page_digest), UNCHANGED
+
+    seen = record['row_count'] if record is not None else 0
+    if record is not None and seen <= len(table) and table_digest(row_hashes[:seen]) == record['table_digest']:
+        # Append-only change: classify the new rows that do not repeat earlier ones
+        new_rows = ~table.duplicated().to_numpy()
+        new_rows[:seen] = False
+        old_fee_table, old_fields = record['ledger']
+        added_fee_table, added_fields = classify_ledger(table[new_rows], first_name, last_name, case_number)
+        fee_table = pd.concat([old_fee_table, added_fee_table])
+        fields = pd.concat([old_fields, added_fields], ignore_index=True)
+        status = APPENDED
+    else:
+        fee_table, fields = classify_ledger(table, first_name, last_name, case_number)
+        status = NEW if record is None else RECOMPUTED
+
+    result = summarize_ledger(fee_table, fields, first_name, last_name, case_number)
+    last_date = table['date'].max() if len(table) else None
+    record = {
+        'version': STATE_VERSION,
+        'page_digest': page_digest,
+        'table_digest': digest,
+        'row_count': len(table),
+        'last_date': None if pd.isna(last_date) else last_date,
+        'ledger': (fee_table, fields),
+        'result': result,
+    }
+    return result, record, status
+
+
+class CaseStateStore:
+    """Per-case state from earlier runs, pickled into an SQLite table.
+
+    Each record holds the page and docket table digests, the number of
+    docket rows and the last docket date seen, the classified ledger rows,
+    and the calculated result.
+    """
+
+    def __init__(self, path=STATE_PATH):
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS cases (key TEXT PRIMARY KEY, table_digest TEXT, row_count INTEGER, "
+            "last_date TEXT, updated_at REAL, record BLOB)"
+        )
+        self.db.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT record FROM cases WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            record = pickle.loads(zlib.decompress(row[0]))
+        except Exception:
+            record = None
+        # Written by an incompatible version; the case is simply recomputed
+        return record if record is not None and record.get('version') == STATE_VERSION else None
+
+    def put(self, key, record):
+        blob = zlib.compress(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        last_date = None if record['last_date'] is None else str(record['last_date'])
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO cases VALUES (?, ?, ?, ?, ?, ?)",
+                (key, record['table_digest'], record['row_count'], last_date, time.time(), blob)
+            )
+            self.db.commit()
+
+    def calculate(self, case_number, html, first_name, last_name):
+        """extract_and_calculate for one docket page, reusing and updating saved state."""
+        key = case_key(case_number, first_name, last_name)
+        previous = self.get(key)
+        result, record, _ = refresh_case(previous, case_number, html, first_name, last_name)
+        if record is not previous:
+            self.put(key, record)
+        return result
+
+    def calculate_all(self, cases, first_name, last_name, executor=None, statuses=None):
+        """`calculate` for `(case_number, html)` pairs, optionally in `executor`'s workers.
+
+        Saved state is read and written here; the workers only get each
+        case's previous record and hand back the updated one. Returns results
+        by case number in input order, and counts how each was reached in
+        the `statuses` dict if one is passed.
+        """
+        keys = [case_key(case_number, first_name, last_name) for case_number, _ in cases]
+        saved = [self.get(key) for key in keys]
+        arguments = [(previous, case_number, html, first_name, last_name)
+                     for previous, (case_number, html) in zip(saved, cases)]
+        if executor is None:
+            refreshed = [refresh_case(*args) for args in arguments]
+        else:
+            refreshed = map_traced(executor, refresh_case, *zip(*arguments)) if arguments else []
+
+        results = {}
+        for key, previous, (case_number, _), (result, record, status) in zip(keys, saved, cases, refreshed):
+            if previous is None or record['page_digest'] != previous['page_digest']:
+                self.put(key, record)
+            if statuses is not None:
+                statuses[status] = statuses.get(status, 0) + 1
+            results[case_number] = result
+        return results
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = CaseStateStore()
+    return _default_store
@@ -1,88 +1,117 @@
-import re
-import requests
+import atexit
+import contextvars
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
 import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from bs4 import BeautifulSoup
+import httpx
 import streamlit as st
 import pandas as pd
+import numpy as np
+
+from case_result import CaseResult
+from docket_parser import parse_docket
+from endpoints import OSCN_BASE_URL
+from extraction import extract_description_fields, name_pattern, transfer_amount
+from fetching import fetch_all, shared_limiter, MAX_IN_FLIGHT, REQUESTS_PER_SECOND, RateLimitedClient
+from http_cache import cached_get
+from streaks import payment_streak
+from timing import count, map_traced, span, submit_traced
+from transport import shared_client
 
 def longest_streak(data):
-    data['date'] = pd.to_datetime(data['date'])
-    data.set_index('date', inplace=True)
-    fee_table_monthly = data.resample('M').count().reset_index()
-    max_streak = 0
-    current_streak = 0
-    total_paid_months = 0
+    streak_length, _, _, _ = payment_streak(data['date'])
+    return streak_length
 
-    # Ensure the values in the data are numeric
-    fee_table_monthly = fee_table_monthly.apply(pd.to_numeric, errors='coerce')
 
-    for i, row in fee_table_monthly.iterrows():
-        if row[1] > 0:
-            total_paid_months += 1
-            current_streak += 1
+def update_amount_by_name(fee_table, first_name, last_name, case_number, transfer_amounts=None):
+    full_name = f'{last_name.upper()}, {first_name.upper()}'
+    zero_rows = (fee_table['amount'] == 0.0).to_numpy()
 
-            if current_streak > max_streak:
-                max_streak = current_streak
-        else:
-            current_streak = 0
+    # Transfers already pulled out by extract_description_fields, or found here with the cached pattern
+    if transfer_amounts is None:
+        named = fee_table['description'].str.contains(full_name, regex=False, na=False).to_numpy()
+        transfer_amounts = np.full(len(fee_table), np.nan)
+        for i in np.flatnonzero(zero_rows & named):
+            transfer_amounts[i] = transfer_amount(fee_table['description'].iat[i], case_number, full_name)
 
-    return max_streak
+    update = zero_rows & ~np.isnan(transfer_amounts)
+    if update.any():
+        amounts = fee_table['amount'].to_numpy(dtype=float, copy=True)
+        amounts[update] = transfer_amounts[update]
+        fee_table['amount'] = amounts
 
+    return fee_table
 
-def update_amount_by_name(fee_table, first_name, last_name, case_number):
-    full_name = f'{last_name.upper()}, {first_name.upper()}'
-    name_rows = fee_table[(fee_table['amount'] == 0.0) & (fee_table['description'].str.contains(full_name))]
+def classify_ledger(fee_table, first_name, last_name, case_number):
+    """Row-by-row half of extract_and_calculate.
 
-    for index, row in name_rows.iterrows():
-        text = row['description']
-        amounts = re.findall(
-            r'' + re.escape(case_number) + r':\s*\$([\d,.]+)\s+ON TRANSFER TO.*?' + re.escape(full_name) + r'\b', text)
-        if amounts:
-            total_amount = sum([float(amount.replace(',', '')) for amount in amounts])
-            fee_table.loc[index, 'amount'] = total_amount
+    Returns the de-duplicated docket rows without victims entries and the
+    description fields aligned with them by position, plus whether each
+    row's party matches the client. Nothing here depends on other rows, so
+    rows appended to a docket can be classified on their own and
+    concatenated onto an earlier result.
+    """
+    with span('extract', case=case_number):
+        return _classify_ledger(fee_table, first_name, last_name, case_number)
 
-    return fee_table
 
-def extract_and_calculate(fee_table, first_name, last_name, case_number):
+def _classify_ledger(fee_table, first_name, last_name, case_number):
     fee_table = fee_table.drop_duplicates()
 
+    # One pass over the descriptions for every amount and flag used below; it is
+    # filtered in step with fee_table by position
+    fields = extract_description_fields(fee_table['description'], case_number, first_name, last_name)
+
     # Remove rows with 'VICTIMS' in the description
-    fee_table = fee_table[~fee_table['description'].str.contains('VICTIMS', case=False, na=False)]
+    keep = ~fields['victims'].to_numpy()
+    fee_table, fields = fee_table[keep], fields[keep].reset_index(drop=True)
 
-    full_name = f'{last_name.upper()}, {first_name.upper()}'
-    if fee_table['party'].isnull().all() or fee_table['party'].eq('').all():
-        pass
-    else:
-        try:
-            first_name = first_name.lower()
-            last_name = last_name.lower()
+    fields['party_null'] = fee_table['party'].isnull().to_numpy()
+    fields['party_empty'] = fee_table['party'].eq('').to_numpy()
+    try:
+        party = fee_table['party'].str.lower()
+        fields['party_match'] = (party.str.contains(name_pattern(first_name.lower())) |
+                                 party.str.contains(name_pattern(last_name.lower()))).fillna(False).to_numpy(dtype=bool)
+        fields['party_match'] |= fields['mentions_name']
+    except AttributeError:
+        fields['party_match'] = True
 
-            mask = ((fee_table['party'].str.lower().str.contains(first_name)) | \
-                    (fee_table['party'].str.lower().str.contains(last_name)) | \
-                    (fee_table['description'].str.lower().str.contains(first_name)) & \
-                    (fee_table['description'].str.lower().str.contains(last_name))).fillna(False)
+    return fee_table, fields
 
-            fee_table = fee_table[mask]
 
-        except AttributeError:
-            pass
+def extract_and_calculate(fee_table, first_name, last_name, case_number):
+    fee_table, fields = classify_ledger(fee_table, first_name, last_name, case_number)
+    return summarize_ledger(fee_table, fields, first_name, last_name, case_number)
+
+
+def summarize_ledger(fee_table, fields, first_name, last_name, case_number):
+    with span('calculate', case=case_number):
+        return _summarize_ledger(fee_table, fields, first_name, last_name, case_number)
+
 
-    # Add a new column "payment_plan" with 1 if "payment plan" is found in the 'description' column, 0 otherwise
-    has_payment_plan = int(fee_table['description'].str.lower().str.contains('payment plan').any())
-    already_received_waiver = int(fee_table['description'].str.lower().str.contains('grants 983a').any())
+def _summarize_ledger(fee_table, fields, first_name, last_name, case_number):
+    # Only filter by party when the docket lists parties at all
+    if not (fields['party_null'].all() or fields['party_empty'].all()):
+        mask = fields['party_match'].to_numpy(dtype=bool)
+        fee_table, fields = fee_table[mask], fields[mask]
 
-    # Your original code
-    fee_table_issued1 = fee_table[fee_table["amount"].str.contains('\d', na=False)]
+    has_payment_plan = int(fields['payment_plan'].any())
+    already_received_waiver = int(fields['waiver_983a'].any())
 
-    # Fix the SettingWithCopyWarning
-    fee_table_issued1 = fee_table_issued1.copy()
-    fee_table_issued1.loc[:, 'amount'] = fee_table_issued1['amount'].str.replace('[ ,$]', '', regex=True).astype(float)
+    # The parser leaves 'amount' numeric, NaN where the cell had no amount
+    fee_table_issued1 = fee_table[fee_table['amount'].notna()].copy()
 
     if not (fee_table_issued1['amount'] > 0).any():
         # The alternative code
         fee_table_issued2 = fee_table.copy()
-        fee_table_issued2['amount'] = fee_table['description'].str.extract(r'\[(?:.*?)(\d+\.\d{2})(?:.*?)\]')
-        fee_table_issued2['amount'] = pd.to_numeric(fee_table_issued2['amount'], errors='coerce')
+        fee_table_issued2['amount'] = fields['bracketed'].to_numpy()
 
         fee_table_issued2 = fee_table_issued2[
             ~fee_table_issued2['code'].isin(['ACCOUNT', 'PAY', 'TEXT'])
@@ -97,62 +126,30 @@ def extract_and_calculate(fee_table, first_name, last_name, case_number):
 
     total_amount_owed = round(fee_table_issued['amount'].sum(), 2)
 
-    fee_table = fee_table[
-        fee_table['code'].isin(['ACCOUNT', 'PAY', 'TEXT'])
-    ]
+    accounting = fee_table['code'].isin(['ACCOUNT', 'PAY', 'TEXT']).to_numpy()
+    fee_table, fields = fee_table[accounting], fields[accounting]
 
-    fee_table_copy = fee_table.copy()
+    # Receipts carry "TOTAL AMOUNT PAID: $x"; older dockets only "TOTAL AMOUNT PAID ON CASE # ... : $x"
+    paid_total = fields['paid_total'].to_numpy()
+    receipts = ~np.isnan(paid_total) & (paid_total >= 0)
+    paid = paid_total
+    if not receipts.any():
+        receipts = fields['receipt'].to_numpy()
+        paid = fields['paid_on_case'].to_numpy()
 
-    # Extract the dollar amount from the description column using regular expressions
-    pattern = r'TOTAL AMOUNT PAID:\s*\$?\s*(\d+\.\d{2})'
-    fee_table['amount'] = fee_table['description'].str.extract(pattern)
-    fee_table['amount'] = fee_table['amount'].str.replace('$', '', regex=True).astype(float)
-    fee_table = fee_table.dropna(subset=['amount'])
-    fee_table = fee_table[fee_table['amount'] >= 0]
-
-    if len(fee_table) == 0:
-        pattern = r'TOTAL AMOUNT PAID ON CASE # [A-Za-z0-9-]* : \$\s?(\d+\.\d{2})'
-        fee_table = fee_table_copy.copy()
-        fee_table['amount'] = fee_table['description'].str.extract(pattern)
-        fee_table['amount'] = fee_table['amount'].str.replace('$', '', regex=True).astype(float)
-        fee_table = fee_table[fee_table['description'].str.lower().str.contains('receipt', na=False)]
+    fee_table = fee_table[receipts].copy()
+    fee_table['amount'] = paid[receipts]
+    transfer_amounts = fields['transfer'].to_numpy()[receipts]
 
     fee_table.reset_index(drop=True, inplace=True)
     # Update the 'amount' column in fee_table for rows with a 0.0 amount and the full name in the 'description' column
-    fee_table = update_amount_by_name(fee_table, first_name, last_name, case_number)
-    fee_table_paid = fee_table.copy()
+    fee_table = update_amount_by_name(fee_table, first_name, last_name, case_number, transfer_amounts)
     total_amount_paid = fee_table['amount'].sum()
-    fee_table['date'] = pd.to_datetime(fee_table['date'])
-
-    fee_table.set_index('date', inplace=True)
-    fee_table_monthly = fee_table.resample('M').count().reset_index()
-
-    def longest_streak(data):
-        max_streak = 0
-        current_streak = 0
-        end_month = None
-        total_paid_months = 0
-
-        for i, row in data.iterrows():
-            if row[1] > 0:
-                total_paid_months += 1
-                current_streak += 1
-
-                if current_streak > max_streak:
-                    max_streak = current_streak
-                    end_month_index = row['date']
-                    end_month = fee_table.loc[fee_table.index <= end_month_index].index.max()
-                    start_month_index = data.loc[i - max_streak + 1, 'date']
-                    start_month = fee_table.loc[fee_table.index >= start_month_index].index.min()
-            else:
-                current_streak = 0
+    streak_length, _, streak_end, total_paid_months = payment_streak(fee_table['date'])
 
-        return max_streak, total_paid_months, end_month
-
-    streak_length, total_paid_months, streak_end = longest_streak(fee_table_monthly)
-
-
-    return streak_length, total_paid_months, streak_end, total_amount_paid, total_amount_owed, has_payment_plan, already_received_waiver, fee_table_paid, fee_table_issued
+    # The fee tables are packed into compact arrays; DataFrames are rebuilt only for display and export
+    return CaseResult(streak_length, total_paid_months, streak_end, total_amount_paid, total_amount_owed,
+                      has_payment_plan, already_received_waiver, fee_table, fee_table_issued)
 
 def extract_fee_table(soup):
     tables = soup.select("table[id*='results-list']")  # Select tables with 'results-list' in the id
@@ -179,96 +176,64 @@ def extract_fee_table(soup):
             pass
     return dataframes
 
-def extract_docket_table(soup):
-    tables = soup.select("table.docketlist.ocis, table.docketlist.kp")
-    dataframes = []
-    for table in tables:
-        try:
-            df = pd.read_html(str(table))[0]
-            dataframes.append(df)
-        except:
-            pass
-    fee_table = pd.concat(dataframes)
-    fee_table.columns = [col.lower() for col in fee_table.columns]
-    fee_table['date'] = fee_table['date'].fillna(method='ffill')
-    default_amount = ""
-    fee_table['amount'].fillna(default_amount, inplace=True)
-
+def extract_docket_table(html):
+    # Single lxml pass over the docket rows with typed columns, see docket_parser
+    with span('parse'):
+        fee_table = parse_docket(html)
+    count('rows_parsed', len(fee_table))
     return fee_table
 
-@st.cache_data
-def search_cases(guid, first_name, last_name, middle_name=''):
-    base_url = "https://www.oscn.net/dockets/Results.aspx?db=all&number=&lname={}&fname={}&mname={}"
+# Searches kept per browser session, newest last
+SESSION_SEARCHES = 4
 
-    # Format the URL with the provided names
-    url = base_url.format(last_name, first_name, middle_name)
-    progress_text = st.empty()
-    # Define headers for the request
-    headers = {
+
+def name_key(first_name, last_name, middle_name=''):
+    return last_name.strip().lower(), first_name.strip().lower(), (middle_name or '').strip().lower()
+
+
+def oscn_headers(guid):
+    return {
         "User-Agent": guid,
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
     }
 
-    # Make the request
-    response = requests.get(url, headers=headers)
-    # If the request was successful, parse the result
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.content, 'html.parser')
+
+def search_cases(guid, first_name, last_name, middle_name=''):
+    # Only the Results.aspx page: dockets are loaded later, for the cases still selected (see docket_loader).
+    # Kept in session state under the normalized name rather than in st.cache_data,
+    # which would unpickle the frame again on every widget interaction.
+    key = name_key(first_name, last_name, middle_name)
+    searches = st.session_state.setdefault('case_searches', {})
+    if key not in searches:
+        searches[key] = run_case_search(guid, first_name, last_name, middle_name, fetch=False)
+        while len(searches) > SESSION_SEARCHES:
+            del searches[next(iter(searches))]
+    return searches[key]
+
+
+def run_case_search(guid, first_name, last_name, middle_name='', max_in_flight=MAX_IN_FLIGHT,
+                    requests_per_second=REQUESTS_PER_SECOND, progress=None, fetch=True):
+    # The uncached search behind search_cases. With `fetch` every docket is downloaded
+    # too (see fetch_dockets); without it the frame only has the Results.aspx columns.
+    with span('search'):
+        df = _run_case_search(guid, first_name, last_name, middle_name, requests_per_second)
+        if fetch and not df.empty:
+            df = fetch_dockets(df, guid, first_name, last_name, max_in_flight, requests_per_second, progress)
+        return df
 
 
-        # Find all tr elements with class 'resultTableRow'
-        rows = soup.find_all('tr', class_='resultTableRow')
-
-        # Prepare empty lists for DataFrame
-        case_numbers = []
-        dates = []
-        case_names = []
-        found_names = []
-        counties = []
-        links = []
-        htmls = []
-        counter = 1
-        case_number_set = set()  # Set to store case numbers
-
-        # Loop through each row
-        for row in rows:
-            tds = row.find_all('td')
-            case_number = tds[0].text.strip()
-
-            if case_number in case_number_set:
-                counter += 1
-                continue  # Skip adding rows with duplicate case numbers
-
-            case_number_set.add(case_number)
-            case_numbers.append(case_number)
-            dates.append(tds[1].text.strip())
-            case_names.append(tds[2].text.strip())
-            found_names.append(tds[3].text.strip())
-            link = "https://www.oscn.net/dockets/" + tds[0].find('a')['href']
-            links.append(link)
-            response = requests.get(link, headers=headers)
-            htmls.append(BeautifulSoup(response.content, 'html.parser'))
-            time.sleep(1)
-
-            # Find the county, strip everything after "Found", and convert to title case
-            full_county_text = row.find_previous('table', class_='caseCourtTable').find('caption',
-                                                                                        class_='caseCourtHeader').text.strip()
-            county = full_county_text.split("Found")[0].strip().title()
-            counties.append(county)
-            progress_text.text(f'Finished {counter} of {len(rows)}: {tds[0].text.strip()}')
-            counter += 1
-
-        # Create DataFrame
-        df = pd.DataFrame({
-            'Case Number': case_numbers,
-            'Court': counties,
-            'Found Party': found_names,
-            'Date': dates,
-            'Case Name': case_names,
-            'Link': links,
-            'HTML': htmls
-
-        })
+def _run_case_search(guid, first_name, last_name, middle_name, requests_per_second=REQUESTS_PER_SECOND):
+    base_url = OSCN_BASE_URL + "Results.aspx?db=all&number=&lname={}&fname={}&mname={}"
+
+    # Format the URL with the provided names
+    url = base_url.format(last_name, first_name, middle_name)
+
+    # Make the request, within the same per-host rate as the docket downloads
+    response = cached_get(url, headers=oscn_headers(guid),
+                          client=RateLimitedClient(shared_limiter(requests_per_second)))
+    # If the request was successful, parse the result
+    if response.status_code == 200:
+        df = parse_case_results(response.content)
 
         try:
             df['Court'] = df['Court'].replace(['Court', 'County'], '', regex=True).str.strip().str.title()
@@ -282,9 +247,323 @@ def search_cases(guid, first_name, last_name, middle_name=''):
         return pd.DataFrame()  # Return empty DataFrame if request fails
 
 
+def with_case(case_number, error):
+    """`error` again with the case number in front of its message, so a failure says which case it was."""
+    message = f'Case {case_number}: {error}'
+    if isinstance(error, httpx.HTTPStatusError):
+        return httpx.HTTPStatusError(message, request=error.request, response=error.response)
+    try:
+        return type(error)(message)
+    except TypeError:
+        return RuntimeError(message)
+
+
+def stream_dockets(case_numbers, links, guid, first_name, last_name, max_in_flight=MAX_IN_FLIGHT,
+                   requests_per_second=REQUESTS_PER_SECOND, wanted=None, failed=None):
+    """Download docket pages concurrently, yielding `(index, packed page)` as each is ready.
+
+    `wanted(case_number)` is asked just before each download, and the cases
+    it turns down are skipped. A download that fails or answers with an
+    error status raises, naming its case, unless `failed(case_number,
+    error)` is given; then the case is handed to it and the others go on.
+    """
+    # Downloads are submitted lazily, so `order` has grown to cover an index by the time fetch_all yields it
+    order = []
+
+    def requested():
+        for i, link in enumerate(links):
+            if wanted is None or wanted(case_numbers[i]):
+                order.append(i)
+                yield link
+
+    responses = fetch_all(requested(), headers=oscn_headers(guid), max_in_flight=max_in_flight,
+                          requests_per_second=requests_per_second, return_exceptions=True)
+    for k, response in responses:
+        # An error page that outlasted the retries would otherwise parse as a docket with no fees
+        i = order[k]
+        try:
+            if isinstance(response, Exception):
+                raise response
+            response.raise_for_status()
+        except Exception as e:
+            if failed is None:
+                raise with_case(case_numbers[i], e) from e
+            failed(case_numbers[i], with_case(case_numbers[i], e))
+            continue
+        yield i, pack_html(response.content)
+
+
+def fetch_dockets(df, guid, first_name, last_name, max_in_flight=MAX_IN_FLIGHT,
+                  requests_per_second=REQUESTS_PER_SECOND, progress=None):
+    # A copy of `df` (search results) with every docket in an 'HTML' column; `progress` receives status lines
+    case_numbers, links = df['Case Number'].tolist(), df['Link'].tolist()
+    htmls = [None] * len(links)
+    dockets = stream_dockets(case_numbers, links, guid, first_name, last_name, max_in_flight, requests_per_second)
+    for counter, (i, html) in enumerate(dockets, start=1):
+        htmls[i] = html
+        if progress is not None:
+            progress(f'Finished {counter} of {len(links)}: {case_numbers[i]}')
+
+    df = df.copy()
+    df['HTML'] = htmls
+    return df
+
+
+# A DocketLoader's thread exits after this long with nothing queued, and starts again on the next prefetch
+LOADER_IDLE_SECONDS = 60
+
+
+class DocketLoader:
+    """Dockets for one search, downloaded and calculated in the background as cases are asked for.
+
+    `prefetch(cases)` makes `cases` the ones wanted and queues those not
+    already loaded or on their way. One thread works through the queue, so
+    the per-host rate limit holds, and skips any case no longer wanted when
+    its download comes up. Each page is calculated as it arrives: from the
+    memo if the same docket was calculated before, otherwise with `state`
+    (a case_state.CaseStateStore) reusing earlier runs, in the process pool
+    when there is more than one worker and PARALLEL_MIN_CASES or more cases
+    were queued together. A case whose docket fails is set aside with its
+    error (see failures) and the rest go on. `wait(cases)` retries those
+    of `cases` that failed, blocks until all are in or failed again and
+    returns `{case: (packed page, CaseResult)}` for the ones that loaded.
+    `close()` stops the thread.
+    """
+
+    def __init__(self, guid, first_name, last_name, links_by_case, max_in_flight=MAX_IN_FLIGHT,
+                 requests_per_second=REQUESTS_PER_SECOND, state=None):
+        self.guid = guid
+        self.first_name = first_name
+        self.last_name = last_name
+        self.links_by_case = links_by_case
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.state = state
+        self.loaded = {}
+        self.failed = {}
+        self.requested = set()
+        self.wanted = set()
+        self.closed = False
+        self.error = None
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def prefetch(self, cases):
+        with self.lock:
+            if self.closed:
+                return
+            self.wanted = set(cases)
+            cases = [case for case in dict.fromkeys(cases) if case in self.links_by_case
+                     and case not in self.requested]
+            self.requested.update(cases)
+            if not cases:
+                return
+            self.queue.put(cases)
+            if self.thread is None:
+                # Spans from the background go to the trace that was active when loading started
+                self.thread = threading.Thread(target=contextvars.copy_context().run, args=(self._work,), daemon=True)
+                self.thread.start()
+
+    def close(self):
+        # Stop downloading; the thread finishes the page in hand and exits
+        with self.lock:
+            self.closed = True
+            self.wanted = set()
+            self.queue.put(None)
+
+    def _claim(self, case):
+        # Whether to download `case` now; a case passed over can be queued again by a later prefetch
+        with self.lock:
+            if case in self.wanted:
+                return True
+            self.requested.discard(case)
+            return False
+
+    def _work(self):
+        while True:
+            try:
+                cases = self.queue.get(timeout=LOADER_IDLE_SECONDS)
+            except queue.Empty:
+                with self.lock:
+                    if self.queue.empty():
+                        self.thread = None
+                        return
+                continue
+            if cases is None:
+                return
+            try:
+                self._load(cases)
+            except Exception as e:
+                # Forget the cases that did not load, so asking again retries them
+                with self.lock:
+                    self.error = e
+                    self.requested.difference_update(case for case in cases if case not in self.loaded)
+
+    def _load(self, cases):
+        # case_state imports this module, so it is only imported once both are loaded
+        from case_state import case_key, refresh_case
+
+        # The same cut-off as process_urls: a few cases are calculated on a thread here, in this trace
+        parallel = PROCESS_WORKERS > 1 and len(cases) >= PARALLEL_MIN_CASES
+        local = None if parallel else ThreadPoolExecutor(max_workers=1)
+
+        def submit(fn, *args):
+            if local is not None:
+                return local.submit(contextvars.copy_context().run, fn, *args)
+            return submit_traced(process_pool(), fn, *args)
+
+        pending = {}
+        try:
+            dockets = stream_dockets(cases, [self.links_by_case[case] for case in cases], self.guid,
+                                     self.first_name, self.last_name, self.max_in_flight, self.requests_per_second,
+                                     wanted=self._claim, failed=self._failed)
+            for i, html in dockets:
+                case = cases[i]
+                memo_key = case_memo_key(case, html, self.first_name, self.last_name)
+                result = memo_get(memo_key)
+                if result is not None:
+                    self._loaded(case, html, memo_key, result)
+                elif self.state is not None:
+                    state_key = case_key(case, self.first_name, self.last_name)
+                    previous = self.state.get(state_key)
+                    future = submit(refresh_case, previous, case, html, self.first_name, self.last_name)
+                    pending[future] = (case, html, memo_key, state_key, previous)
+                else:
+                    future = submit(calculate_case, case, html, self.first_name, self.last_name)
+                    pending[future] = (case, html, memo_key, None, None)
+                # Hand over what has been calculated while the downloads go on
+                self._collect(pending, [future for future in pending if future.done()])
+            self._collect(pending, list(pending))
+        finally:
+            if local is not None:
+                local.shutdown(wait=False)
+
+    def _collect(self, pending, futures):
+        for future in futures:
+            case, html, memo_key, state_key, previous = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                self._failed(case, e)
+                continue
+            if state_key is not None:
+                result, record, _ = result
+                if previous is None or record['page_digest'] != previous['page_digest']:
+                    self.state.put(state_key, record)
+            self._loaded(case, html, memo_key, result)
+
+    def _loaded(self, case, html, memo_key, result):
+        memo_put(memo_key, result)
+        with self.lock:
+            self.loaded[case] = (html, result)
+
+    def _failed(self, case, error):
+        # Kept until the next wait() asks for the case again, so prefetches do not retry it on every rerun
+        with self.lock:
+            self.failed[case] = error
+
+    def failures(self, cases):
+        """`{case: error}` for those of `cases` whose docket could not be downloaded or calculated."""
+        with self.lock:
+            return {case: self.failed[case] for case in cases if case in self.failed}
+
+    def wait(self, cases, progress=None, poll_seconds=0.1):
+        # Cases that failed before are tried once more
+        with self.lock:
+            retry = [case for case in cases if case in self.failed]
+            for case in retry:
+                del self.failed[case]
+            self.requested.difference_update(retry)
+        self.prefetch(cases)
+        while True:
+            with self.lock:
+                done = sum(case in self.loaded or case in self.failed for case in cases)
+                pending = [case for case in cases if case in self.requested and case not in self.loaded
+                           and case not in self.failed]
+                error = self.error
+            if progress is not None:
+                progress(f'Loaded {done} of {len(cases)} dockets')
+            if not pending:
+                break
+            time.sleep(poll_seconds)
+        with self.lock:
+            missing = [case for case in cases if case in self.links_by_case and case not in self.loaded
+                       and case not in self.failed]
+            if missing and error is not None:
+                raise error
+            return {case: self.loaded[case] for case in cases if case in self.loaded}
+
+
+def docket_loader(guid, first_name, last_name, middle_name, df, state=None):
+    # The session's DocketLoader for a search_cases result, under the same key as the search.
+    # `state` is used when the loader is made; loaders dropped from the session are closed.
+    key = name_key(first_name, last_name, middle_name)
+    loaders = st.session_state.setdefault('docket_loaders', {})
+    if key not in loaders:
+        links_by_case = dict(zip(df['Case Number'], df['Link'])) if not df.empty else {}
+        loaders[key] = DocketLoader(guid, first_name, last_name, links_by_case, state=state)
+        while len(loaders) > SESSION_SEARCHES:
+            loaders.pop(next(iter(loaders))).close()
+    return loaders[key]
+
+
+def parse_case_results(content):
+    # One row per case on an OSCN Results.aspx page, in page order
+    with span('parse', page='results'):
+        return _parse_case_results(content)
+
+
+def _parse_case_results(content):
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Find all tr elements with class 'resultTableRow'
+    rows = soup.find_all('tr', class_='resultTableRow')
+
+    # Prepare empty lists for DataFrame
+    case_numbers = []
+    dates = []
+    case_names = []
+    found_names = []
+    counties = []
+    links = []
+    case_number_set = set()  # Set to store case numbers
+
+    # Loop through each row
+    for row in rows:
+        tds = row.find_all('td')
+        case_number = tds[0].text.strip()
+
+        if case_number in case_number_set:
+            continue  # Skip adding rows with duplicate case numbers
+
+        case_number_set.add(case_number)
+        case_numbers.append(case_number)
+        dates.append(tds[1].text.strip())
+        case_names.append(tds[2].text.strip())
+        found_names.append(tds[3].text.strip())
+        link = OSCN_BASE_URL + tds[0].find('a')['href']
+        links.append(link)
+
+        # Find the county, strip everything after "Found", and convert to title case
+        full_county_text = row.find_previous('table', class_='caseCourtTable').find('caption',
+                                                                                    class_='caseCourtHeader').text.strip()
+        county = full_county_text.split("Found")[0].strip().title()
+        counties.append(county)
+
+    return pd.DataFrame({
+        'Case Number': case_numbers,
+        'Court': counties,
+        'Found Party': found_names,
+        'Date': dates,
+        'Case Name': case_names,
+        'Link': links,
+    })
+
+
 @st.cache_data
 def navigate_and_get_url_soups(url_list, case_list, guid):
-    base_url = "https://www.oscn.net/dockets/Results.aspx?db=all&number=&lname={}&fname={}&mname={}"
+    base_url = OSCN_BASE_URL + "Results.aspx?db=all&number=&lname={}&fname={}&mname={}"
 
     # Format the url with the provided names
     url = base_url.format("jordan", "leroy", "albert")
@@ -296,13 +575,31 @@ def navigate_and_get_url_soups(url_list, case_list, guid):
     }
 
     # Make the request
-    response = requests.get(url, headers=headers)
+    response = shared_client().get(url, headers=headers)
     # If the request was successful, parse the result
     if response.status_code == 200:
         soup = BeautifulSoup(response.content, 'html.parser')
         st.write(soup)
 
 
+class PackedHtml(bytes):
+    """zlib-compressed page bytes from pack_html; the type, not the first byte, tells unpack_html to decompress."""
+
+
+def pack_html(content, compress=True):
+    # Keep raw page bytes (optionally zlib-compressed) rather than a parsed tree,
+    # which is many times larger and slow to pickle through st.cache_data
+    return PackedHtml(zlib.compress(content, 6)) if compress else content
+
+
+def unpack_html(html):
+    if isinstance(html, BeautifulSoup):
+        return str(html)
+    if isinstance(html, PackedHtml):
+        return zlib.decompress(html)
+    return html
+
+
 def create_case_soup_dict(case_list, html_list):
     oscn_case_soup_dict = {}
     for case, html in zip(case_list, html_list):
@@ -310,13 +607,113 @@ def create_case_soup_dict(case_list, html_list):
     return oscn_case_soup_dict
 
 
-def process_urls(case_soup_dict, first_name, last_name):
-    results = {}
+# calculate_case results by (case number, docket digest, name), shared by every session.
+# CaseResults are a few KB, so the memo stays in the tens of MB.
+CASE_MEMO_SIZE = 4096
+
+_case_memo = OrderedDict()
+_case_memo_lock = threading.Lock()
+
+
+def docket_digest(html):
+    # Over the page as stored (usually packed), which is all a cache key needs
+    data = html if isinstance(html, bytes) else str(html).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
 
-    for case_number, html in case_soup_dict.items():
-        soup = BeautifulSoup(html, 'html.parser')
-        fee_table = extract_docket_table(soup)
-        result = extract_and_calculate(fee_table, first_name, last_name, case_number)
-        results[case_number] = result
 
+def case_memo_key(case_number, html, first_name, last_name):
+    return (case_number, docket_digest(html), *name_key(first_name, last_name)[:2])
+
+
+def memo_get(key):
+    with _case_memo_lock:
+        result = _case_memo.get(key)
+        if result is not None:
+            _case_memo.move_to_end(key)
+        return result
+
+
+def memo_put(key, result):
+    with _case_memo_lock:
+        _case_memo[key] = result
+        _case_memo.move_to_end(key)
+        while len(_case_memo) > CASE_MEMO_SIZE:
+            _case_memo.popitem(last=False)
+
+
+def calculate_case(case_number, html, first_name, last_name):
+    # Parse one docket page and calculate its fees; module level so process pools can run it
+    with span('case', case=case_number):
+        try:
+            fee_table = extract_docket_table(unpack_html(html))
+            return extract_and_calculate(fee_table, first_name, last_name, case_number)
+        except Exception as e:
+            raise with_case(case_number, e) from e
+
+
+# Parallel Step 4: below PARALLEL_MIN_CASES the pickling and process start-up cost more than they save
+PROCESS_WORKERS = int(os.environ.get("PARSE_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_CASES = 16
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def process_context():
+    # Fork server (or spawn) start method for process pools made while other threads are running
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def process_pool():
+    """The process-wide pool for parsing and calculation, started on first use.
+
+    Workers come from a fork server (or are spawned) rather than forked from
+    the Streamlit server, whose threads may hold locks at fork time.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS, mp_context=process_context())
+            atexit.register(_process_pool.shutdown)
+    return _process_pool
+
+
+def calculate_cases(cases, first_name, last_name, executor=None):
+    """calculate_case for every `(case_number, html)` pair, in order.
+
+    With an `executor` the packed pages go to its workers and come back as
+    CaseResults; otherwise they are worked through here.
+    """
+    if executor is None:
+        return [calculate_case(case_number, html, first_name, last_name) for case_number, html in cases]
+    case_numbers = [case_number for case_number, _ in cases]
+    htmls = [html for _, html in cases]
+    chunksize = max(1, len(cases) // (PROCESS_WORKERS * 4))
+    with span('cases', workers=PROCESS_WORKERS):
+        return map_traced(executor, calculate_case, case_numbers, htmls, [first_name] * len(cases),
+                          [last_name] * len(cases), chunksize=chunksize)
+
+
+def process_urls(case_soup_dict, first_name, last_name, state=None, parallel=None):
+    # Cases already in the memo are reused; `state` (a case_state.CaseStateStore) skips or
+    # shortens work on the others if seen before. `parallel` defaults to using the process
+    # pool for PARALLEL_MIN_CASES or more cases to calculate.
+    keys = {case_number: case_memo_key(case_number, html, first_name, last_name)
+            for case_number, html in case_soup_dict.items()}
+    results = {case_number: memo_get(key) for case_number, key in keys.items()}
+
+    # Parse lazily, only for the cases selected in Step 4, keeping the selection order
+    cases = [(case_number, case_soup_dict[case_number]) for case_number, result in results.items() if result is None]
+    if parallel is None:
+        parallel = PROCESS_WORKERS > 1 and len(cases) >= PARALLEL_MIN_CASES
+    executor = process_pool() if parallel and cases else None
+    if state is not None:
+        calculated = state.calculate_all(cases, first_name, last_name, executor=executor)
+    else:
+        calculated = dict(zip([case_number for case_number, _ in cases],
+                              calculate_cases(cases, first_name, last_name, executor=executor)))
+    for case_number, result in calculated.items():
+        results[case_number] = result
+        memo_put(keys[case_number], result)
     return results
\ No newline at end of file
@@ -0,0 +1,73 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from name_search import NameSearchIndex
+
+EMPTY = np.array([], dtype=np.int64)
+SEPARATOR = '\x1f'
+
+
+def normalize_name(name):
+    return str(name).strip().lower()
+
+
+class NameIndex:
+    """Normalized (last, first) name -> row positions, via offsets into a stable argsort."""
+
+    def __init__(self, first_names, last_names):
+        keys = last_names.str.strip().str.lower().str.cat(first_names.str.strip().str.lower(), sep=SEPARATOR)
+        codes, names = pd.factorize(keys)
+        self.order = np.argsort(codes, kind='stable')[np.count_nonzero(codes < 0):]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(names)))])
+        self.names = list(names)
+        self.slots = dict(zip(self.names, range(len(self.names))))
+
+    def positions(self, slot):
+        return self.order[self.offsets[slot]:self.offsets[slot + 1]]
+
+    def lookup(self, first_name, last_name):
+        slot = self.slots.get(normalize_name(last_name) + SEPARATOR + normalize_name(first_name))
+        if slot is None:
+            return EMPTY
+        return self.positions(slot)
+
+
+class IdIndex:
+    """Sorted unique ids with offsets into a stable argsort, for O(log n) id -> rows."""
+
+    def __init__(self, ids):
+        ids = ids.fillna('').astype(str).to_numpy(dtype=str)
+        self.order = np.argsort(ids, kind='stable')
+        self.ids, self.starts, counts = np.unique(ids[self.order], return_index=True, return_counts=True)
+        self.ends = self.starts + counts
+
+    def lookup(self, id):
+        i = np.searchsorted(self.ids, id)
+        if i == len(self.ids) or self.ids[i] != id:
+            return EMPTY
+        return self.order[self.starts[i]:self.ends[i]]
+
+
+class DocIndex:
+    """Lookup structures over the DOC alias, sentence and profile tables."""
+
+    def __init__(self, alias_df, sentence_df, profile_df):
+        self.alias_names = NameIndex(alias_df['first_name'], alias_df['last_name'])
+        self._alias_search = None
+        self._alias_search_lock = threading.Lock()
+        self.sentence_ids = IdIndex(sentence_df['id'])
+        self.profile_ids = IdIndex(profile_df['id'])
+
+    @property
+    def alias_search(self):
+        """NameSearchIndex over the distinct alias names, in NameIndex slot order, built on first use."""
+        with self._alias_search_lock:
+            if self._alias_search is None:
+                self._alias_search = NameSearchIndex(self.alias_names.names, SEPARATOR)
+        return self._alias_search
+
+    def warm(self):
+        """Build the fuzzy search index in the background, so exact lookups need not wait for it."""
+        threading.Thread(target=lambda: self.alias_search, daemon=True).start()
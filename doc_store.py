@@ -0,0 +1,116 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+STORE_DIR = os.path.join('data', '.columnar')
+SCHEMA_VERSION = '1'
+CATEGORICAL_COLUMNS = ['status', 'facility', 'sentencing_court']
+
+METADATA_PREFIX = b'doc_store.'
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store_path(csv_path, store_dir):
+    return os.path.join(store_dir, os.path.splitext(os.path.basename(csv_path))[0] + '.arrow')
+
+
+def _stored_metadata(arrow_path):
+    # Only the file footer is read to get at the schema
+    try:
+        with pa.memory_map(arrow_path, 'r') as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    return {key[len(METADATA_PREFIX):].decode(): value.decode()
+            for key, value in metadata.items() if key.startswith(METADATA_PREFIX)}
+
+
+def _is_current(stored, csv_path):
+    if stored is None or stored.get('schema_version') != SCHEMA_VERSION:
+        return False
+    stat = os.stat(csv_path)
+    if stored.get('source_size') != str(stat.st_size):
+        return False
+    if stored.get('source_mtime_ns') == str(stat.st_mtime_ns):
+        return True
+    # Touched but possibly unchanged (e.g. a fresh checkout): compare contents
+    return stored.get('source_sha256') == file_checksum(csv_path)
+
+
+def _write(df, csv_path, arrow_path):
+    stat = os.stat(csv_path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({
+        METADATA_PREFIX + b'schema_version': SCHEMA_VERSION.encode(),
+        METADATA_PREFIX + b'source_sha256': file_checksum(csv_path).encode(),
+        METADATA_PREFIX + b'source_size': str(stat.st_size).encode(),
+        METADATA_PREFIX + b'source_mtime_ns': str(stat.st_mtime_ns).encode(),
+    })
+    table = table.replace_schema_metadata(metadata)
+    os.makedirs(os.path.dirname(arrow_path), exist_ok=True)
+    temporary_path = arrow_path + '.tmp'
+    with pa.OSFile(temporary_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temporary_path, arrow_path)
+
+
+def _read(arrow_path):
+    with pa.memory_map(arrow_path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    # Strings stay in the mapped Arrow buffers instead of becoming Python objects
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype('pyarrow')}.get)
+
+
+def object_strings(df):
+    """`df` with its Arrow-backed string columns as object columns, blanks as NaN, the way pd.read_csv gives them.
+
+    For the few rows a lookup returns, so code casting them with
+    `.astype(str)` or `.astype(float)` sees 'nan' and NaN rather than
+    '<NA>' and pd.NA.
+    """
+    columns = [column for column, dtype in df.dtypes.items() if isinstance(dtype, pd.StringDtype)]
+    if not columns:
+        return df
+    df = df.copy()
+    for column in columns:
+        df[column] = df[column].astype(object).where(df[column].notna(), np.nan)
+    return df
+
+
+def load_table(csv_path, store_dir=STORE_DIR, **read_csv_kwargs):
+    """Load a DOC CSV through an uncompressed Arrow IPC copy of it.
+
+    The Arrow file is memory-mapped when its schema version and recorded
+    source size/mtime (or SHA-256) still match the CSV. Otherwise the CSV
+    is parsed once, `CATEGORICAL_COLUMNS` become categoricals, and the
+    file is rewritten for the next process. String columns stay in the
+    mapped buffers as `string[pyarrow]`; see object_strings for the rows
+    handed on from a lookup.
+    """
+    arrow_path = _store_path(csv_path, store_dir)
+    if _is_current(_stored_metadata(arrow_path), csv_path):
+        return _read(arrow_path)
+
+    df = pd.read_csv(csv_path, **read_csv_kwargs)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    try:
+        _write(df, csv_path, arrow_path)
+    except (OSError, pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        print(f"Could not write columnar copy of {csv_path}: {e}")
+        return df
+    # Hand back the same dtypes a warm start would see
+    return _read(arrow_path)
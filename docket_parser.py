@@ -0,0 +1,120 @@
+import re
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+DOCKET_COLUMNS = ['date', 'code', 'description', 'count', 'party', 'amount']
+
+DOCKET_TABLES = (
+    "//table[contains(concat(' ', normalize-space(@class), ' '), ' docketlist ') and "
+    "(contains(concat(' ', normalize-space(@class), ' '), ' ocis ') or "
+    "contains(concat(' ', normalize-space(@class), ' '), ' kp '))]"
+)
+
+# Cell values pd.read_html treats as missing
+NA_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A',
+    'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+WHITESPACE = re.compile(r'\s+')
+AMOUNT_CHARS = r'[ ,$]'
+
+
+def _cell_text(cell):
+    return WHITESPACE.sub(' ', ''.join(cell.itertext()).strip())
+
+
+def _row_cells(row):
+    cells = []
+    for cell in row:
+        if cell.tag not in ('td', 'th'):
+            continue
+        text = _cell_text(cell)
+        try:
+            span = int(cell.get('colspan', 1))
+        except ValueError:
+            span = 1
+        cells.extend([text] * max(span, 1))
+    return cells
+
+
+def _to_document(html):
+    if hasattr(html, 'decode') and not isinstance(html, bytes):
+        html = str(html)  # a BeautifulSoup tree
+    if isinstance(html, bytes):
+        try:
+            html = html.decode('utf-8')
+        except UnicodeDecodeError:
+            html = html.decode('cp1252', errors='replace')
+    try:
+        document = etree.HTML(html)
+    except ValueError:  # str with an XML encoding declaration
+        document = etree.HTML(html.encode('utf-8'))
+    return document if document is not None else etree.HTML('<html></html>')
+
+
+def _table_rows(table):
+    header = None
+    rows = []
+    for row in table.xpath('./thead/tr|./tbody/tr|./tr|./tfoot/tr'):
+        in_head = row.getparent().tag == 'thead'
+        all_th = all(cell.tag == 'th' for cell in row if cell.tag in ('td', 'th'))
+        if header is None and (in_head or (all_th and not rows)):
+            header = [text.lower() for text in _row_cells(row)]
+        elif not in_head:
+            rows.append(_row_cells(row))
+    return header or [], rows
+
+
+def parse_docket(html):
+    """Parse the `docketlist ocis` / `docketlist kp` tables of an OSCN docket page.
+
+    Walks the docket rows once with lxml and returns a frame with typed
+    columns: `date` (datetime64, forward filled), `code`, `description`,
+    `count` (float), `party` and `amount` (float, NaN where blank).
+    `html` may be bytes, str or a BeautifulSoup tree. Raises ValueError
+    when the page has no docket table, e.g. an error or captcha page.
+    """
+    document = _to_document(html)
+    tables = document.xpath(DOCKET_TABLES)
+    if not tables:
+        raise ValueError('No docket table found on the page')
+    columns = {}
+    n_rows = 0
+    for table in tables:
+        # <br> separates words the way pd.read_html read them
+        for br in table.iter('br'):
+            br.tail = '\n' + (br.tail or '')
+        header, rows = _table_rows(table)
+        if not header:
+            continue
+        width = len(header)
+        for name in header:
+            if name not in columns:
+                columns[name] = [None] * n_rows
+        for cells in rows:
+            cells = cells[:width] + [''] * (width - len(cells))
+            for name, text in zip(header, cells):
+                columns[name].append(None if text in NA_VALUES else text)
+            n_rows += 1
+            for values in columns.values():
+                if len(values) < n_rows:
+                    values.append(None)
+
+    for name in DOCKET_COLUMNS:
+        columns.setdefault(name, [None] * n_rows)
+    fee_table = pd.DataFrame({name: np.array(values, dtype=object) for name, values in columns.items()})
+
+    dates = fee_table['date'].fillna(method='ffill')
+    parsed = pd.to_datetime(dates, format='%m-%d-%Y', errors='coerce')
+    unparsed = parsed.isna() & dates.notna()
+    if unparsed.any():
+        parsed[unparsed] = pd.to_datetime(dates[unparsed], errors='coerce')
+    fee_table['date'] = parsed
+    fee_table['count'] = pd.to_numeric(fee_table['count'], errors='coerce')
+    fee_table['amount'] = pd.to_numeric(
+        fee_table['amount'].str.replace(AMOUNT_CHARS, '', regex=True), errors='coerce'
+    ).astype(float)
+    return fee_table
@@ -0,0 +1,158 @@
+import atexit
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+POOL_SIZE = int(os.environ.get("CHROME_POOL_SIZE", 2))
+MAX_USES = 50
+DRIVER_PATH_CACHE = os.path.join(".cache", "chromedriver.json")
+
+
+def chromedriver_path():
+    # ChromeDriverManager().install() checks versions over the network; reuse
+    # the path it resolved last time as long as the binary is still there
+    try:
+        with open(DRIVER_PATH_CACHE) as f:
+            path = json.load(f)["path"]
+        if os.path.exists(path):
+            return path
+    except (OSError, ValueError, KeyError):
+        pass
+    path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(DRIVER_PATH_CACHE), exist_ok=True)
+    with open(DRIVER_PATH_CACHE, "w") as f:
+        json.dump({"path": path}, f)
+    return path
+
+
+def launch_driver():
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument('--headless')
+    service = Service(executable_path=chromedriver_path())
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+
+def is_healthy(driver):
+    try:
+        return driver.execute_script("return 1") == 1
+    except WebDriverException:
+        return False
+
+
+class DriverPool:
+    """Keeps up to `size` headless Chrome instances warm for reuse.
+
+    A driver is health-checked when it is checked out, replaced if it has
+    died, and retired after `max_uses` searches so a long-lived browser
+    does not accumulate state. A driver whose search raised, or was
+    interrupted, is discarded.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_uses=MAX_USES):
+        self.size = size
+        self.max_uses = max_uses
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def warm(self):
+        """Launch browsers up to the pool size in the background."""
+        def launch():
+            with self.lock:
+                if self.created >= self.size:
+                    return
+                self.created += 1
+            try:
+                self.idle.put((launch_driver(), 0))
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+
+        for _ in range(self.size):
+            threading.Thread(target=launch, daemon=True).start()
+
+    def _launch(self):
+        try:
+            return launch_driver(), 0
+        except Exception:
+            with self.lock:
+                self.created -= 1
+            raise
+
+    def _checkout(self):
+        while True:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self.lock:
+                can_launch = self.created < self.size
+                if can_launch:
+                    self.created += 1
+            if can_launch:
+                return self._launch()
+            # Wait for a driver to come back; re-check in case one was retired instead
+            try:
+                return self.idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def _retire(self, driver):
+        with self.lock:
+            self.created -= 1
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    @contextmanager
+    def driver(self):
+        driver, uses = self._checkout()
+        if not is_healthy(driver):
+            # Replace a crashed browser in the same slot
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+            driver, uses = self._launch()
+        try:
+            yield driver
+        except BaseException:
+            # Interrupts and generator exits too, so the slot is always given back
+            self._retire(driver)
+            raise
+        uses += 1
+        if uses >= self.max_uses:
+            self._retire(driver)
+        else:
+            self.idle.put((driver, uses))
+
+    def close(self):
+        while True:
+            try:
+                driver, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self._retire(driver)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def driver_pool():
+    """The process-wide pool, created and warmed on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            _pool.warm()
+            atexit.register(_pool.close)
+    return _pool
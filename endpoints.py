@@ -0,0 +1,6 @@
+import os
+
+# Base URLs for the court sites. Override with environment variables to point
+# the scrapers at a local stub or replay server.
+OSCN_BASE_URL = os.environ.get("OSCN_BASE_URL", "https://www.oscn.net/dockets/")
+ODCR_BASE_URL = os.environ.get("ODCR_BASE_URL", "https://www1.odcr.com/")
@@ -0,0 +1,85 @@
+import datetime
+import heapq
+import math
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# The header style DataFrame.to_excel uses, as xlsxwriter format properties
+HEADER_FORMAT = {'bold': True, 'top': 1, 'right': 1, 'bottom': 1, 'left': 1, 'align': 'center', 'valign': 'top'}
+DATE_FORMAT = 'mm-dd-yyyy'
+
+
+def cell_value(value):
+    """`value` converted the way to_excel writes it, or None for an empty cell."""
+    # Ordered by how often each type turns up in the fee tables
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        if math.isnan(value):
+            return None
+        return value if not math.isinf(value) else ('inf' if value > 0 else '-inf')
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (datetime.date, datetime.timedelta)):
+        return value
+    return None if np.ndim(value) == 0 and pd.isna(value) else str(value)
+
+
+def frame_cells(frame, startrow=0, startcol=0, index=False):
+    """Yield `(row, col, value, is_header)` for `frame.to_excel(startrow=, startcol=, index=)`, row by row."""
+    offset = startcol + 1 if index else startcol
+    for j, column in enumerate(frame.columns):
+        yield startrow, offset + j, column, True
+    labels = frame.index if index else [None] * len(frame)
+    for i, (label, values) in enumerate(zip(labels, frame.itertuples(index=False, name=None)), start=startrow + 1):
+        if index:
+            yield i, startcol, label, True
+        for j, value in enumerate(values):
+            yield i, offset + j, value, False
+
+
+def label_cell(row, col, text):
+    yield row, col, text, False
+
+
+class StreamingWorkbook:
+    """An xlsxwriter workbook in constant_memory mode, filled one sheet at a time.
+
+    Each sheet is given as blocks of cells (see frame_cells), which are
+    merged into row order, since constant_memory mode flushes a row to disk
+    as soon as a later row is written.
+    """
+
+    def __init__(self, output):
+        self.book = xlsxwriter.Workbook(output, {'constant_memory': True})
+        self.header_format = self.book.add_format(HEADER_FORMAT)
+        self.date_format = self.book.add_format({'num_format': DATE_FORMAT})
+        self.header_date_format = self.book.add_format(dict(HEADER_FORMAT, num_format=DATE_FORMAT))
+
+    def write_sheet(self, name, *blocks):
+        worksheet = self.book.add_worksheet(name)
+        for row, col, value, is_header in heapq.merge(*blocks, key=itemgetter(0)):
+            value = cell_value(value)
+            if value is None:
+                continue
+            if is_header:
+                cell_format = self.header_date_format if isinstance(value, datetime.date) else self.header_format
+                worksheet.write(row, col, value, cell_format)
+            elif isinstance(value, float) or type(value) is int:
+                worksheet.write_number(row, col, value)
+            elif isinstance(value, datetime.date):
+                worksheet.write_datetime(row, col, value, self.date_format)
+            else:
+                # write() keeps xlsxwriter's string handling (URLs become links)
+                worksheet.write(row, col, value)
+
+    def close(self):
+        self.book.close()
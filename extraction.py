@@ -0,0 +1,81 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+PAID_TOTAL = re.compile(r'TOTAL AMOUNT PAID:\s*\$?\s*(\d+\.\d{2})')
+PAID_ON_CASE = re.compile(r'TOTAL AMOUNT PAID ON CASE # [A-Za-z0-9-]* : \$\s?(\d+\.\d{2})')
+BRACKETED = re.compile(r'\[(?:.*?)(\d+\.\d{2})(?:.*?)\]')
+
+FIELD_COLUMNS = ['paid_total', 'paid_on_case', 'transfer', 'bracketed', 'payment_plan', 'waiver_983a', 'victims',
+                 'receipt', 'mentions_name']
+
+
+@lru_cache(maxsize=1024)
+def transfer_pattern(case_number, full_name):
+    # "<case>: $12.34 ON TRANSFER TO ... <LAST, FIRST>" line items
+    return re.compile(re.escape(case_number) + r':\s*\$([\d,.]+)\s+ON TRANSFER TO.*?' + re.escape(full_name) + r'\b')
+
+
+@lru_cache(maxsize=1024)
+def name_pattern(name):
+    # Names are matched as patterns, the way str.contains matched them
+    return re.compile(name)
+
+
+def transfer_amount(text, case_number, full_name):
+    """Sum of the transfers from `case_number` to `full_name` in `text`, or NaN if there are none."""
+    amounts = transfer_pattern(case_number, full_name).findall(text)
+    if not amounts:
+        return np.nan
+    return sum(float(amount.replace(',', '')) for amount in amounts)
+
+
+def _amount(pattern, text):
+    match = pattern.search(text)
+    return float(match.group(1)) if match else np.nan
+
+
+def extract_description_fields(descriptions, case_number, first_name, last_name):
+    """Pull every amount and flag the fee calculation needs out of docket descriptions.
+
+    Makes one pass over `descriptions`, lowercasing each once, and returns a
+    frame aligned with it by position:
+
+    - `paid_total`: the `TOTAL AMOUNT PAID:` receipt amount
+    - `paid_on_case`: the `TOTAL AMOUNT PAID ON CASE #` amount
+    - `transfer`: summed transfers from `case_number` to the client
+    - `bracketed`: the first `[... 12.34 ...]` issued amount
+    - `payment_plan`, `waiver_983a`, `victims`, `receipt`: text flags
+    - `mentions_name`: both the first and last name appear
+    """
+    full_name = f'{last_name.upper()}, {first_name.upper()}'
+    first_pattern = name_pattern(first_name.lower())
+    last_pattern = name_pattern(last_name.lower())
+
+    columns = {name: [] for name in FIELD_COLUMNS}
+    for text in descriptions:
+        if not isinstance(text, str):
+            for name in ('paid_total', 'paid_on_case', 'transfer', 'bracketed'):
+                columns[name].append(np.nan)
+            for name in ('payment_plan', 'waiver_983a', 'victims', 'receipt', 'mentions_name'):
+                columns[name].append(False)
+            continue
+        lower = text.lower()
+        columns['paid_total'].append(_amount(PAID_TOTAL, text) if 'TOTAL AMOUNT PAID' in text else np.nan)
+        columns['paid_on_case'].append(_amount(PAID_ON_CASE, text) if 'TOTAL AMOUNT PAID ON' in text else np.nan)
+        columns['transfer'].append(transfer_amount(text, case_number, full_name) if full_name in text else np.nan)
+        columns['bracketed'].append(_amount(BRACKETED, text) if '[' in text else np.nan)
+        columns['payment_plan'].append('payment plan' in lower)
+        columns['waiver_983a'].append('grants 983a' in lower)
+        columns['victims'].append('victims' in lower)
+        columns['receipt'].append('receipt' in lower)
+        columns['mentions_name'].append(
+            first_pattern.search(lower) is not None and last_pattern.search(lower) is not None
+        )
+
+    return pd.DataFrame({
+        name: np.array(values, dtype=float if name in ('paid_total', 'paid_on_case', 'transfer', 'bracketed') else bool)
+        for name, values in columns.items()
+    })
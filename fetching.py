@@ -0,0 +1,130 @@
+import contextvars
+import itertools
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from http_cache import cached_get
+from transport import shared_client
+
+# Defaults for the concurrent fetch engine. OSCN used to get one request per
+# second from the sequential loop, so keep the per-host rate polite.
+MAX_IN_FLIGHT = 4
+REQUESTS_PER_SECOND = 2.0
+BURST = 2
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, at most `capacity` banked."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """One token bucket per host, created on first use."""
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        if not self.rate:
+            return
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, max(self.burst, 1))
+        bucket.acquire()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def shared_limiter(rate=REQUESTS_PER_SECOND, burst=BURST):
+    """The process-wide HostRateLimiter for `rate` and `burst`.
+
+    Every search, session and loader fetching at the same rate draws on
+    the same per-host buckets, so together they stay within `rate` for
+    each host.
+    """
+    key = (float(rate or 0), burst)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = HostRateLimiter(rate, burst)
+    return limiter
+
+
+class RateLimitedClient:
+    """Wraps `client.get` so every request first takes a token for its host (from shared_limiter() by default)."""
+
+    def __init__(self, limiter=None, client=None):
+        self.limiter = limiter or shared_limiter()
+        self.client = client or shared_client()
+
+    def get(self, url, **kwargs):
+        self.limiter.acquire(url)
+        return self.client.get(url, **kwargs)
+
+
+def fetch_all(urls, headers=None, max_in_flight=MAX_IN_FLIGHT, requests_per_second=REQUESTS_PER_SECOND,
+              burst=BURST, client=None, cached=True, limiter=None, return_exceptions=False):
+    """Download `urls` concurrently, yielding `(index, response)` as each one completes.
+
+    At most `max_in_flight` requests are open at once and each host is held to
+    `requests_per_second`, shared with every other fetch at that rate in the
+    process (see shared_limiter) unless a `limiter` is passed. With `cached`,
+    pages are served from the disk cache when fresh and only real network
+    requests take a rate-limit token. Callers that need input order should
+    slot results back by index. With `return_exceptions`, a download that
+    failed is yielded as its exception instead of raising and ending the run.
+    """
+    limited = RateLimitedClient(limiter or shared_limiter(requests_per_second, burst), client)
+
+    def fetch(url):
+        if cached:
+            return cached_get(url, headers=headers, client=limited)
+        return limited.get(url, headers=headers)
+
+    # Requests are submitted as earlier ones finish rather than all up front, so a
+    # consumer that stops pulling results also stops new downloads from piling up
+    urls = iter(enumerate(urls))
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max(max_in_flight, 1)) as executor:
+        def submit(count):
+            # Each worker runs in a copy of the caller's context, so timing spans reach its trace
+            for i, url in itertools.islice(urls, count):
+                pending[executor.submit(contextvars.copy_context().run, fetch, url)] = i
+
+        submit(max(max_in_flight, 1))
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            submit(len(done))
+            for future in done:
+                i = pending.pop(future)
+                if return_exceptions and future.exception() is not None:
+                    yield i, future.exception()
+                else:
+                    yield i, future.result()
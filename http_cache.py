@@ -0,0 +1,227 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from timing import count, span
+from transport import shared_client
+
+CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", os.path.join(".cache", "http"))
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Freshness per URL class, matched against the normalized URL in order.
+# Search results change as new cases are filed; dockets and ODCR detail pages
+# change far less often and are revalidated once stale.
+HOUR = 60 * 60
+TTL_RULES = [
+    (re.compile(r"/results\.aspx", re.I), 12 * HOUR),
+    (re.compile(r"/getcaseinformation\.aspx", re.I), 72 * HOUR),
+    (re.compile(r"/detail\b", re.I), 72 * HOUR),
+]
+DEFAULT_TTL = 24 * HOUR
+
+# What a page of each URL class must contain to be cached. OSCN answers captcha,
+# throttle and error pages with a 200 too, and one of those cached for a whole
+# TTL would fail every parse of that URL until it expired. A search with no
+# results has no result rows either, so it is fetched again each time.
+CONTENT_RULES = [
+    (re.compile(r"/results\.aspx", re.I), re.compile(rb"resultTableRow")),
+    (re.compile(r"/getcaseinformation\.aspx", re.I), re.compile(rb"docketlist")),
+]
+
+
+def normalize_url(url):
+    """Lowercase scheme and host, drop default ports and fragments, and sort the query."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rsplit(':', 1)[-1]) in (('http', '80'), ('https', '443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+def ttl_for(url):
+    for pattern, ttl in TTL_RULES:
+        if pattern.search(url):
+            return ttl
+    return DEFAULT_TTL
+
+
+def cacheable(url, content):
+    for pattern, marker in CONTENT_RULES:
+        if pattern.search(url):
+            return marker.search(content) is not None
+    return True
+
+
+class CachedResponse:
+    """The parts of an HTTP response the scrapers use, served from disk."""
+
+    def __init__(self, url, status_code, content, headers, from_cache):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        match = re.search(r'charset=([\w-]+)', self.headers.get('Content-Type', ''))
+        return self.content.decode(match.group(1) if match else 'utf-8', errors='replace')
+
+    def raise_for_status(self):
+        pass
+
+
+class HttpCache:
+    """Disk cache of zlib-compressed response bodies with an LRU size cap.
+
+    Bodies live in `directory` under the SHA-256 of the normalized URL; an
+    SQLite index next to them holds validators, fetch and access times.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT, "
+            "content_type TEXT, fetched_at REAL, accessed_at REAL, size INTEGER)"
+        )
+        self.db.commit()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def lookup(self, url):
+        """Return `(entry, body)` for `url`, or `(None, None)` when it is not cached."""
+        key = hashlib.sha256(url.encode()).hexdigest()
+        with self.lock:
+            entry = self.db.execute(
+                "SELECT key, etag, last_modified, content_type, fetched_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if entry is None:
+                return None, None
+            try:
+                with open(self._path(key), 'rb') as f:
+                    body = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.db.commit()
+                return None, None
+            self.db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+        return dict(zip(('key', 'etag', 'last_modified', 'content_type', 'fetched_at'), entry)), body
+
+    def store(self, url, content, headers):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        compressed = zlib.compress(content, 6)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.lock:
+            with open(path, 'wb') as f:
+                f.write(compressed)
+            now = time.time()
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, headers.get('ETag'), headers.get('Last-Modified'), headers.get('Content-Type', ''),
+                 now, now, len(compressed))
+            )
+            self.db.commit()
+            self._evict()
+
+    def touch(self, key):
+        with self.lock:
+            now = time.time()
+            self.db.execute("UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self.db.commit()
+
+    def clear(self):
+        # Forget every entry, e.g. so a load test starts cold
+        with self.lock:
+            for (key,) in self.db.execute("SELECT key FROM entries").fetchall():
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self.db.execute("DELETE FROM entries")
+            self.db.commit()
+
+    def _evict(self):
+        # Drop least recently used bodies until the cache is back under 90% of its cap
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            if total <= target:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+        self.db.commit()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+    return _default_cache
+
+
+def cached_get(url, headers=None, client=None, cache=None):
+    """GET `url` through the disk cache.
+
+    Fresh entries are served without touching the network. Stale entries are
+    revalidated with If-None-Match / If-Modified-Since when the server sent
+    validators, and a 304 refreshes the entry. Only 200 responses that look
+    like the page their URL asks for (see CONTENT_RULES) are stored;
+    anything else is returned from `client` (by default the shared
+    transport.shared_client()) unchanged.
+    """
+    with span('fetch'):
+        return _cached_get(url, headers, client or shared_client(), cache or default_cache())
+
+
+def _cached_get(url, headers, client, cache):
+    normalized = normalize_url(url)
+    entry, body = cache.lookup(normalized)
+    request_headers = dict(headers or {})
+
+    if entry is not None:
+        cached_headers = {'Content-Type': entry['content_type']}
+        if time.time() - entry['fetched_at'] < ttl_for(normalized):
+            count('cache_hits')
+            return CachedResponse(url, 200, body, cached_headers, True)
+        if entry['etag']:
+            request_headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+    response = client.get(url, headers=request_headers)
+    count('bytes_downloaded', len(response.content))
+
+    if response.status_code == 304 and entry is not None:
+        count('cache_hits')
+        cache.touch(entry['key'])
+        return CachedResponse(url, 200, body, cached_headers, True)
+    count('cache_misses')
+    if response.status_code == 200 and cacheable(normalized, response.content):
+        cache.store(normalized, response.content, response.headers)
+        return CachedResponse(url, 200, response.content, response.headers, False)
+    return response
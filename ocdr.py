@@ -8,7 +8,10 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
 from bs4 import BeautifulSoup
 import time
-import requests
+
+from endpoints import ODCR_BASE_URL
+from odcr_details import parse_odcr_detail_fast
+from transport import shared_client
 
 def extract_fee_table(soup):
     tables = soup.select("table[id*='results-list']")  # Select tables with 'results-list' in the id
@@ -22,7 +25,7 @@ def extract_fee_table(soup):
     return dataframes
 
 def search_cases(party_name):
-    url = "https://www1.odcr.com/"
+    url = ODCR_BASE_URL
 
     # Set up Chrome options for headless mode
     chrome_options = webdriver.ChromeOptions()
@@ -66,30 +69,11 @@ def search_cases(party_name):
 def scrape_odcr(url):
     # Add the desired URL prefix to the URL if it doesn't have one already
     if not url.startswith('http'):
-        url = "https://www1.odcr.com/" + url
-
-    # Send a GET request to the website and get the page content
-    response = requests.get(url)
-    html_content = response.content
-
-    # Parse the HTML content with BeautifulSoup
-    soup = BeautifulSoup(html_content, 'html.parser')
+        url = ODCR_BASE_URL + url
 
-    # Extract the amount owed from the table
-    amount_owed = None
-    th_elements = soup.find_all('th', text="Amount Owed")
-    if th_elements:
-        td_element = th_elements[0].find_next('td')
-        amount_owed_str = td_element.text.strip().split()[0]
-        amount_owed = float(amount_owed_str.replace('$', ''))
-
-    # Extract the table under the section id named "receipts"
-    receipts_table = None
-    receipts_section = soup.find('section', {'id': 'receipts'})
-    if receipts_section:
-        receipts_table = pd.read_html(str(receipts_section))[0].iloc[:-1]
-
-    return amount_owed, receipts_table
+    # Send a GET request to the website and read the amount owed and receipts table from the page
+    response = shared_client().get(url)
+    return parse_odcr_detail_fast(response.content)
 
 
 url = "detail?court=050-&casekey=050-TR++9901592"
@@ -0,0 +1,158 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from io import StringIO
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+import lxml.html
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from endpoints import ODCR_BASE_URL
+from fetching import fetch_all, MAX_IN_FLIGHT, REQUESTS_PER_SECOND
+from timing import span
+
+# Words dropped from court names before comparing them
+COURT_WORDS = {'county', 'court', 'district'}
+
+# How pd.read_html collapses whitespace in cell text
+WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+# Parsed detail pages by (URL, page digest), shared by every session
+DETAIL_MEMO_SIZE = 2048
+
+_detail_memo = OrderedDict()
+_detail_memo_lock = threading.Lock()
+
+
+def odcr_detail_url(link):
+    return link if link.startswith('http') else urljoin(ODCR_BASE_URL, link)
+
+
+def court_key(court):
+    """A court name reduced for comparison: ODCR's 'TULSA' or 'Roger Mills County' and OSCN's db=rogermills match."""
+    words = re.findall(r'[a-z]+', str(court).lower())
+    return ''.join(word for word in words if word not in COURT_WORDS)
+
+
+def oscn_case_key(case_number, url):
+    # (court, case number) for an OSCN docket link, the court from its db= parameter
+    return court_key(parse_qs(urlsplit(url).query).get('db', [''])[0]), case_number
+
+
+def odcr_detail_links(dataframes):
+    """`{(court, case number): detail page URL}` for the linked rows of web_scraping.extract_fee_table's tables.
+
+    Case numbers repeat across counties, so each is keyed with its court
+    (see court_key), or with the link's ODCR court code when the table has
+    no court column.
+    """
+    links = {}
+    for df in dataframes:
+        if df.empty or 'Link' not in df.columns:
+            continue
+        case_column = next((column for column in df.columns if 'case' in str(column).lower()), df.columns[0])
+        court_column = next((column for column in df.columns if 'court' in str(column).lower()), None)
+        courts = df[court_column] if court_column is not None else [None] * len(df)
+        for case_number, court, link in zip(df[case_column], courts, df['Link']):
+            if not isinstance(link, str) or not link or pd.isna(case_number):
+                continue
+            url = odcr_detail_url(link)
+            if court is None or pd.isna(court):
+                court = parse_qs(urlsplit(url).query).get('court', [''])[0]
+            else:
+                court = court_key(court)
+            links.setdefault((court, str(case_number).strip()), url)
+    return links
+
+
+def cell_text(cell):
+    return WHITESPACE.sub(' ', cell.text_content().strip())
+
+
+def table_frame(table):
+    """The DataFrame pd.read_html makes of a plain lxml `table`, or None when it is not plain.
+
+    Plain means one header row (in <thead> or all <th>), no colspan or
+    rowspan, no nested tables and no hidden elements; read_html handles
+    anything else.
+    """
+    if table.xpath('.//table|.//*[@colspan or @rowspan]|.//*[contains(@style, "display")]'):
+        return None
+    header = table.xpath('.//thead//tr')
+    body = table.xpath('.//tbody//tr') + table.xpath('./tr')
+    if not header:
+        while body and all(cell.tag == 'th' for cell in body[0].xpath('./td|./th')):
+            header.append(body.pop(0))
+    if len(header) != 1:
+        return None
+    rows = [[cell_text(cell) for cell in row.xpath('./td|./th')] for row in header + body + table.xpath('.//tfoot//tr')]
+    width = max(len(row) for row in rows)
+    rows = [row + [''] * (width - len(row)) for row in rows]
+    with TextParser(rows, header=0, thousands=',') as parser:
+        return parser.read()
+
+
+def parse_odcr_detail_fast(content):
+    """utils.parse_odcr_detail on lxml: `(amount_owed, receipts_table)` with the same values, in less time."""
+    root = lxml.html.fromstring(content)
+
+    # The first cell after the first "Amount Owed" header
+    amount_owed = None
+    cells = root.xpath("(//th[.='Amount Owed'])[1]/following::td[1]")
+    if cells:
+        amount_owed = float(cells[0].text_content().strip().split()[0].replace('$', ''))
+
+    # The first table in the receipts section, without its total row
+    receipts_table = None
+    sections = root.xpath("//section[@id='receipts']")
+    if sections:
+        tables = sections[0].xpath('.//table')
+        receipts_table = table_frame(tables[0]) if tables else None
+        if receipts_table is None:
+            receipts_table = pd.read_html(StringIO(lxml.html.tostring(sections[0], encoding='unicode')))[0]
+        receipts_table = receipts_table.iloc[:-1]
+
+    return amount_owed, receipts_table
+
+
+def parse_detail(url, content):
+    # parse_odcr_detail_fast through the memo; a page that cannot be read gives (None, None)
+    key = (url, hashlib.blake2b(content, digest_size=16).hexdigest())
+    with _detail_memo_lock:
+        if key in _detail_memo:
+            _detail_memo.move_to_end(key)
+            return _detail_memo[key]
+    try:
+        detail = parse_odcr_detail_fast(content)
+    except (ValueError, IndexError):
+        detail = (None, None)
+    with _detail_memo_lock:
+        _detail_memo[key] = detail
+        while len(_detail_memo) > DETAIL_MEMO_SIZE:
+            _detail_memo.popitem(last=False)
+    return detail
+
+
+def scrape_odcr_details(links, max_in_flight=MAX_IN_FLIGHT, requests_per_second=REQUESTS_PER_SECOND, progress=None):
+    """Fetch and parse many ODCR case detail pages at once.
+
+    `links` maps (court, case number) keys to detail page links (see
+    odcr_detail_links). Pages come through fetch_all, so they are rate
+    limited per host and served from the disk cache while fresh, and
+    parsed pages are memoized. Returns `{key: (amount_owed,
+    receipts_table)}` in `links` order, with (None, None) for a page that
+    failed. `progress` receives status lines.
+    """
+    keys = list(links)
+    urls = [odcr_detail_url(links[key]) for key in keys]
+    details = [(None, None)] * len(urls)
+    with span('odcr'):
+        fetched = fetch_all(urls, max_in_flight=max_in_flight, requests_per_second=requests_per_second)
+        for counter, (i, response) in enumerate(fetched, start=1):
+            if response.status_code == 200:
+                details[i] = parse_detail(urls[i], response.content)
+            if progress is not None:
+                progress(f'Finished {counter} of {len(urls)} ODCR pages: {keys[i][1]}')
+    return dict(zip(keys, details))
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+STREAK_COLUMNS = ['streak_length', 'streak_start', 'streak_end', 'total_paid_months']
+
+
+def batch_payment_streaks(keys, dates):
+    """Longest run of consecutive paid months for every key in one pass.
+
+    `keys` labels each payment date (a case number, a client id, ...) and
+    `dates` are the payment dates. A month counts as paid when it has at
+    least one payment. Returns a frame indexed by key, in first-seen order,
+    with the longest streak (earliest one on ties), the first and last
+    payment dates inside it, and the total number of paid months.
+    """
+    values = np.asarray(dates)
+    if values.dtype.kind == 'M':
+        # Already datetimes; to_datetime would walk them one by one deciding whether to cache
+        dates = values.astype('datetime64[ns]')
+    else:
+        dates = pd.to_datetime(pd.Series(dates)) if len(dates) else pd.Series([], dtype='datetime64[ns]')
+        dates = dates.to_numpy()
+    codes, uniques = pd.factorize(np.asarray(keys))
+    n_keys = len(uniques)
+
+    streak_length = np.zeros(n_keys, dtype=np.int64)
+    total_paid_months = np.zeros(n_keys, dtype=np.int64)
+    streak_start = np.full(n_keys, np.datetime64('NaT'), dtype='datetime64[ns]')
+    streak_end = streak_start.copy()
+
+    valid = ~np.isnat(dates) & (codes >= 0)
+    codes, dates = codes[valid], dates[valid]
+    if len(dates):
+        order = np.lexsort((dates, codes))
+        codes, dates = codes[order], dates[order]
+        months = dates.astype('datetime64[M]').astype(np.int64)
+
+        # One entry per (key, month) with the first and last payment in it
+        new_month = np.ones(len(dates), dtype=bool)
+        new_month[1:] = (codes[1:] != codes[:-1]) | (months[1:] != months[:-1])
+        month_first = np.flatnonzero(new_month)
+        month_last = np.append(month_first[1:] - 1, len(dates) - 1)
+        month_codes = codes[month_first]
+        month_values = months[month_first]
+
+        # Runs of consecutive months within a key
+        new_run = np.ones(len(month_first), dtype=bool)
+        new_run[1:] = (month_codes[1:] != month_codes[:-1]) | (np.diff(month_values) != 1)
+        run_first = np.flatnonzero(new_run)
+        run_last = np.append(run_first[1:] - 1, len(month_first) - 1)
+        run_length = run_last - run_first + 1
+        run_codes = month_codes[run_first]
+
+        # Longest run per key, earliest first on ties
+        ranked = np.lexsort((run_first, -run_length, run_codes))
+        first_of_key = np.ones(len(ranked), dtype=bool)
+        first_of_key[1:] = run_codes[ranked[1:]] != run_codes[ranked[:-1]]
+        best = ranked[first_of_key]
+
+        best_codes = run_codes[best]
+        streak_length[best_codes] = run_length[best]
+        streak_start[best_codes] = dates[month_first[run_first[best]]]
+        streak_end[best_codes] = dates[month_last[run_last[best]]]
+        total_paid_months[:] = np.bincount(month_codes, minlength=n_keys)
+
+    return pd.DataFrame({
+        'streak_length': streak_length,
+        'streak_start': streak_start,
+        'streak_end': streak_end,
+        'total_paid_months': total_paid_months,
+    }, index=uniques)
+
+
+def payment_streak(dates):
+    """Return `(streak_length, streak_start, streak_end, total_paid_months)` for one ledger.
+
+    Start and end are the first and last payment dates of the streak, or
+    None when there are no payments.
+    """
+    streaks = batch_payment_streaks(np.zeros(len(dates), dtype=np.int64), dates)
+    if streaks.empty or streaks['streak_length'].iloc[0] == 0:
+        return 0, None, None, 0
+    row = streaks.iloc[0]
+    return int(row['streak_length']), row['streak_start'], row['streak_end'], int(row['total_paid_months'])
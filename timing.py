@@ -0,0 +1,223 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+STAGES = ['search', 'fetch', 'parse', 'extract', 'calculate', 'case', 'odcr', 'export']
+COUNTERS = ['bytes_downloaded', 'rows_parsed', 'cache_hits', 'cache_misses', 'retries']
+METRIC_PREFIX = 'fines_'
+
+# Where finished traces are exported for monitoring, when set
+JSONL_PATH = os.environ.get('TIMING_JSONL')
+PROMETHEUS_PATH = os.environ.get('TIMING_PROMETHEUS')
+
+# The trace collecting spans for the current run, and the labels of the enclosing span.
+# Context variables follow the Streamlit script thread; fetch_all copies them into its workers.
+_trace = contextvars.ContextVar('trace', default=None)
+_labels = contextvars.ContextVar('labels', default={})
+
+
+class Trace:
+    """Timing spans and counters collected during one run of the app or a batch."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.lock = threading.Lock()
+
+    def add_span(self, name, start, duration, labels):
+        with self.lock:
+            self.spans.append({'stage': name, 'offset_s': start - self.origin, 'seconds': duration, **labels})
+
+    def add(self, counter, value):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def merge(self, started, spans, counters):
+        """Add spans and counters recorded by a Trace started at `started` (e.g. in a worker process)."""
+        shift = started - self.started
+        with self.lock:
+            self.spans.extend({**span, 'offset_s': span['offset_s'] + shift} for span in spans)
+            for counter, value in counters.items():
+                self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def spans_frame(self):
+        with self.lock:
+            return pd.DataFrame(self.spans)
+
+    def stage_summary(self):
+        """Calls, total, mean and max seconds per stage, in pipeline order."""
+        spans = self.spans_frame()
+        if spans.empty:
+            return pd.DataFrame(columns=['calls', 'total_s', 'mean_ms', 'max_ms'])
+        summary = spans.groupby('stage')['seconds'].agg(calls='count', total_s='sum', mean_ms='mean', max_ms='max')
+        summary[['mean_ms', 'max_ms']] *= 1000
+        order = [stage for stage in STAGES if stage in summary.index]
+        return summary.loc[order + [stage for stage in summary.index if stage not in order]]
+
+    def case_summary(self):
+        """Seconds per case and stage, for spans recorded inside a case."""
+        spans = self.spans_frame()
+        if spans.empty or 'case' not in spans.columns:
+            return pd.DataFrame()
+        spans = spans[spans['case'].notna() & (spans['stage'] != 'case')]
+        return spans.pivot_table(index='case', columns='stage', values='seconds', aggfunc='sum', fill_value=0.0)
+
+    def to_jsonl(self):
+        """One JSON object per span, then one for the counters."""
+        with self.lock:
+            lines = [json.dumps({'type': 'span', 'trace_start': self.started, **span}, default=str)
+                     for span in self.spans]
+            lines.append(json.dumps({'type': 'counters', 'trace_start': self.started, **self.counters}))
+        return '\n'.join(lines) + '\n'
+
+    def to_prometheus(self):
+        """Stage totals and counters of this trace as Prometheus gauges (text exposition format)."""
+        summary = self.stage_summary()
+        lines = [
+            f'# HELP {METRIC_PREFIX}stage_seconds Time spent in each stage in the last traced run.',
+            f'# TYPE {METRIC_PREFIX}stage_seconds gauge',
+        ]
+        lines += [f'{METRIC_PREFIX}stage_seconds{{stage="{stage}"}} {row.total_s:.6f}'
+                  for stage, row in summary.iterrows()]
+        lines += [
+            f'# HELP {METRIC_PREFIX}stage_calls Spans recorded for each stage in the last traced run.',
+            f'# TYPE {METRIC_PREFIX}stage_calls gauge',
+        ]
+        lines += [f'{METRIC_PREFIX}stage_calls{{stage="{stage}"}} {int(row.calls)}'
+                  for stage, row in summary.iterrows()]
+        with self.lock:
+            counters = dict(self.counters)
+        for counter, value in counters.items():
+            lines += [f'# TYPE {METRIC_PREFIX}{counter} gauge', f'{METRIC_PREFIX}{counter} {value}']
+        lines.append(f'{METRIC_PREFIX}trace_timestamp_seconds {self.started:.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_jsonl(self, path):
+        with open(path, 'a') as f:
+            f.write(self.to_jsonl())
+
+    def write_prometheus(self, path):
+        # Written whole and renamed, as the node_exporter textfile collector expects
+        with open(path + '.tmp', 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(path + '.tmp', path)
+
+    def export(self):
+        """Append to $TIMING_JSONL and rewrite $TIMING_PROMETHEUS, for whichever is set."""
+        if JSONL_PATH:
+            self.write_jsonl(JSONL_PATH)
+        if PROMETHEUS_PATH:
+            self.write_prometheus(PROMETHEUS_PATH)
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'labels', 'token', 'start')
+
+    def __init__(self, trace, name, labels):
+        self.trace = trace
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.token = _labels.set(self.labels)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start
+        _labels.reset(self.token)
+        self.trace.add_span(self.name, self.start, duration, self.labels)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+def span(name, **labels):
+    """Time a `with` block as stage `name`; labels (e.g. case=...) are inherited by nested spans.
+
+    Without an active trace this returns a shared no-op context manager.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return NO_SPAN
+    parent = _labels.get()
+    return _Span(trace, name, {**parent, **labels} if parent else labels)
+
+
+def count(counter, value=1):
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(counter, value)
+
+
+def activate(trace):
+    """Make `trace` (or None to switch collection off) the trace for the current context."""
+    _trace.set(trace)
+    return trace
+
+
+def active_trace():
+    return _trace.get()
+
+
+def _traced_call(fn, args, labels):
+    # Run in a worker process: fn(*args) under a Trace of its own, handed back with the result
+    trace = activate(Trace())
+    token = _labels.set(labels)
+    try:
+        result = fn(*args)
+    finally:
+        _labels.reset(token)
+        activate(None)
+    return result, (trace.started, trace.spans, trace.counters)
+
+
+def submit_traced(executor, fn, *args):
+    """`executor.submit(fn, *args)` for a process pool, keeping the spans and counters the call records.
+
+    Worker processes have no trace of their own, so with a trace active
+    here the call runs under a fresh one whose spans (labelled as this
+    context's) and counters are merged into it when the result comes back.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return executor.submit(fn, *args)
+    outer = Future()
+
+    def finish(inner):
+        try:
+            result, recorded = inner.result()
+        except BaseException as e:
+            outer.set_exception(e)
+            return
+        trace.merge(*recorded)
+        outer.set_result(result)
+
+    executor.submit(_traced_call, fn, args, _labels.get()).add_done_callback(finish)
+    return outer
+
+
+def map_traced(executor, fn, *iterables, chunksize=1):
+    """`executor.map(fn, *iterables)` for a process pool, as a list, keeping spans as submit_traced does."""
+    if _trace.get() is None:
+        return list(executor.map(fn, *iterables, chunksize=chunksize))
+    futures = [submit_traced(executor, fn, *args) for args in zip(*iterables)]
+    return [future.result() for future in futures]
@@ -0,0 +1,104 @@
+import importlib.util
+import os
+import random
+import threading
+import time
+
+import httpx
+
+from timing import count
+
+# Timeouts for every request: connecting, and each read, write or wait for a pooled connection
+TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+# Kept-alive connections per client; OSCN and ODCR are each one host, so these are in effect per host
+LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+
+# Retries for overloaded or flaky upstreams, with exponential backoff and full jitter
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 30.0
+
+# HTTP/2 needs the `h2` package and brotli decoding `brotli` or `brotlicffi`; both are used when installed.
+# HTTP_TRANSPORT_HTTP2=0 turns HTTP/2 off.
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+BROTLI_AVAILABLE = any(importlib.util.find_spec(name) is not None for name in ('brotli', 'brotlicffi'))
+HTTP2 = HTTP2_AVAILABLE and os.environ.get('HTTP_TRANSPORT_HTTP2', '1') != '0'
+ACCEPT_ENCODING = 'br, gzip, deflate' if BROTLI_AVAILABLE else 'gzip, deflate'
+
+
+def backoff(attempt, retry_after=None):
+    """Seconds to wait before retry number `attempt` (from 0), honouring a Retry-After in seconds."""
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        except ValueError:
+            pass  # an HTTP date; fall back to backoff
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** attempt))
+
+
+class RetryingClient:
+    """An httpx.Client that retries connection errors, timeouts and RETRY_STATUSES responses.
+
+    Keeps its connections alive between requests, asks for compressed
+    responses, follows redirects, and applies TIMEOUT to every request.
+    `get` and `post` take httpx's arguments and return the last response,
+    or raise the last transport error once the retries are used up. The
+    underlying client is thread-safe, so one instance can serve a pool of
+    fetch threads.
+    """
+
+    def __init__(self, max_retries=MAX_RETRIES, http2=HTTP2, **kwargs):
+        self.max_retries = max_retries
+        headers = {'Accept-Encoding': ACCEPT_ENCODING, **kwargs.pop('headers', {})}
+        self.client = httpx.Client(http2=http2, timeout=TIMEOUT, limits=LIMITS, follow_redirects=True,
+                                   headers=headers, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+                delay = backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    return response
+                delay = backoff(attempt, response.headers.get('Retry-After'))
+                response.close()
+            count('retries')
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def shared_client():
+    """The process-wide client for stateless GETs, so every scraper reuses its pooled connections.
+
+    Flows that depend on cookies (form posts) should make their own
+    RetryingClient instead of sharing this one's cookie jar.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = RetryingClient()
+    return _shared_client
@@ -1,46 +1,76 @@
-import requests
 import streamlit as st
 from bs4 import BeautifulSoup
 import pandas as pd
+import numpy as np
 from io import BytesIO
 
+from aggregation import aggregate_results
+from doc_index import DocIndex
+from doc_store import load_table, object_strings
+from endpoints import ODCR_BASE_URL
+from excel_export import StreamingWorkbook, frame_cells, label_cell
+from http_cache import cached_get
+from odcr_details import oscn_case_key, parse_odcr_detail_fast
+from timing import span
+
 from data_processing import *
 
-@st.cache_data
+@st.cache_resource
 def load_dataframes():
-    alias_df = pd.read_csv("data/alias.csv")
-    sentence_df = pd.read_csv("data/sentence.csv", dtype={'id': str, 'prison_sentence': float})
-    profile_df = pd.read_csv("data/profile.csv", dtype={'id': str})
-    return alias_df, sentence_df, profile_df
-
-@st.cache_data
-def filter_alias_df(alias_df, first_name, last_name):
+    # Shared read-only across sessions; the filters below return copies
+    alias_df = load_table("data/alias.csv")
+    sentence_df = load_table("data/sentence.csv", dtype={'id': str, 'prison_sentence': float})
+    profile_df = load_table("data/profile.csv", dtype={'id': str})
+    doc_index = DocIndex(alias_df, sentence_df, profile_df)
+    doc_index.warm()
+    return alias_df, sentence_df, profile_df, doc_index
+
+def filter_alias_df(alias_df, first_name, last_name, doc_index=None):
+    if doc_index is not None:
+        return object_strings(alias_df.iloc[doc_index.alias_names.lookup(first_name, last_name)]).astype(str)
     first_name, last_name = first_name.lower(), last_name.lower()
     filtered_df = alias_df[alias_df['first_name'].str.lower().eq(first_name) & alias_df['last_name'].str.lower().eq(last_name)]
-    return filtered_df.astype(str)
-
-@st.cache_data
-def filter_sentence_df(sentence_df, id):
-    filtered_df = sentence_df.loc[sentence_df['id'].eq(id)].astype(str).copy()
+    return object_strings(filtered_df).astype(str)
+
+def suggest_alias_df(alias_df, first_name, last_name, doc_index, k=10):
+    # Alias rows for the k closest distinct names, best first
+    slots, scores = doc_index.alias_search.search(first_name, last_name, k)
+    positions = [doc_index.alias_names.positions(slot) for slot in slots]
+    suggestions = object_strings(alias_df.iloc[np.concatenate(positions) if positions else []]).astype(str)
+    suggestions.insert(0, 'match_score', np.repeat(np.round(scores, 2), [len(p) for p in positions]))
+    return suggestions.reset_index(drop=True)
+
+def filter_sentence_df(sentence_df, id, doc_index=None):
+    if doc_index is not None:
+        filtered_df = object_strings(sentence_df.iloc[doc_index.sentence_ids.lookup(id)]).astype(str)
+    else:
+        filtered_df = object_strings(sentence_df.loc[sentence_df['id'].eq(id)]).astype(str).copy()
     filtered_df.loc[:, 'crf_number'] = filtered_df['crf_number'].apply(modify_crf_number)
     filtered_df.loc[:, 'community_sentence'] = filtered_df['community_sentence'].astype(float)
     return filtered_df.reset_index(drop=True)
 
 
-@st.cache_data
-def search_profile(profile_df, id):
+def table_value(value):
+    # A cell from the DOC tables with a missing value (NaN, or pd.NA from an Arrow-backed column) as None
+    return None if pd.isna(value) else value
+
+def search_profile(profile_df, id, doc_index=None):
     official_last_name = None
     official_first_name = None
     official_middle_name = None
     status = None
     facility = None
 
-    filtered_df = profile_df[profile_df['id'].eq(id)]
+    if doc_index is not None:
+        filtered_df = object_strings(profile_df.iloc[doc_index.profile_ids.lookup(id)])
+    else:
+        filtered_df = object_strings(profile_df[profile_df['id'].eq(id)])
     if len(filtered_df) > 0:
-        status, facility = filtered_df.iloc[0][['status', 'facility']]
-        official_last_name = filtered_df['last_name'].values[0]
-        official_first_name = filtered_df['first_name'].values[0]
-        official_middle_name = filtered_df['middle_name'].values[0] if 'middle_name' in filtered_df.columns else None
+        status, facility = map(table_value, filtered_df.iloc[0][['status', 'facility']])
+        official_last_name = table_value(filtered_df['last_name'].values[0])
+        official_first_name = table_value(filtered_df['first_name'].values[0])
+        official_middle_name = (table_value(filtered_df['middle_name'].values[0])
+                                if 'middle_name' in filtered_df.columns else None)
     else:
         status, facility = 'ID not found', 'ID not found'
     return status, facility, official_last_name, official_first_name, official_middle_name, filtered_df.reset_index(drop=True)
@@ -55,12 +85,13 @@ def modify_crf_number(value):
 def scrape_odcr(url):
     # Add the desired URL prefix to the URL if it doesn't have one already
     if not url.startswith('http'):
-        url = "https://www1.odcr.com/" + url
+        url = ODCR_BASE_URL + url
 
     # Send a GET request to the website and get the page content
-    response = requests.get(url)
-    html_content = response.content
+    response = cached_get(url)
+    return parse_odcr_detail_fast(response.content)
 
+def parse_odcr_detail(html_content):
     # Parse the HTML content with BeautifulSoup
     soup = BeautifulSoup(html_content, 'html.parser')
 
@@ -85,101 +116,107 @@ def format_county(county):
     return county.title()
 
 
-def generate_excel_content(results, summary, case_list, url_list):
-    output = BytesIO()
+def summarize_results(results):
+    # Topline figures for Step 4 and the Excel summary sheet; see aggregation.ResultsAggregate
+    return aggregate_results(results).summary
 
-    # Create a summary DataFrame
-    summary_df = pd.DataFrame(
-        data=summary,
-        index=[0],
-        columns=['Total Cases Searched', 'Total Fees Issued', 'Total Fees Paid', 'Total Months Paid',
-                 'Max Consecutive Months Paid - Individual']
-    )
 
-    # Initialize DataFrames for combined fee_table_paid and individual case summaries
-    combined_fee_table_paid = pd.DataFrame()
-    individual_case_summaries = pd.DataFrame()
-
-    # Save individual case information to separate sheets and update combined_fee_table_paid
-    for case_number, result in results.items():
-        url_index = case_list.index(case_number)
-        url = url_list[url_index]
-        streak_length, total_paid_months, _, total_amount_paid, total_amount_owed, _, _, fee_table_paid, fee_table_issued = result
-        receipts_table = None
-
-        # Create a DataFrame with the individual case information (topline)
-        case_info_df = pd.DataFrame(
-            data={
-                'Case Number': [case_number],
-                'URL': [url],
-                'Total Amount Owed': [total_amount_owed],
-                'Total Amount Paid': [total_amount_paid],
-                'Streak Length': [streak_length],
-                'Total Paid Months': [total_paid_months]
-            }
-        )
-
-        # Append individual case summary to the DataFrame
-        individual_case_summaries = pd.concat([individual_case_summaries, case_info_df], ignore_index=True)
-
-        # Append fee_table_paid to the combined DataFrame
-        if fee_table_paid is not None:
-            combined_fee_table_paid = pd.concat([combined_fee_table_paid, fee_table_paid], ignore_index=True)
+SUMMARY_COLUMNS = ['Total Cases Searched', 'Total Fees Issued', 'Total Fees Paid', 'Total Months Paid',
+                   'Max Consecutive Months Paid - Individual']
+CASE_SUMMARY_COLUMNS = ['Case Number', 'URL', 'Total Amount Owed', 'Total Amount Paid', 'Streak Length',
+                        'Total Paid Months']
 
-    # Calculate the longest streak for the combined fee_table_paid
-    max_combined_streak = longest_streak(combined_fee_table_paid.reset_index())
-    summary_df['Max Consecutive Months Paid - All'] = max_combined_streak
+def generate_excel_content(results, summary, case_list, url_list, aggregate=None, odcr_details=None):
+    # `aggregate` is aggregate_results(results), when the caller already has it;
+    # `odcr_details` is odcr_details.scrape_odcr_details's {(court, case): (amount_owed, receipts_table)}
+    with span('export'):
+        return _generate_excel_content(results, summary, case_list, url_list, aggregate, odcr_details or {})
 
-    # Save summary DataFrame, individual_case_summaries, and combined_fee_table_paid to the first sheet
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        summary_df.to_excel(writer, sheet_name='Summary', index=False)
-        individual_case_summaries.to_excel(writer, sheet_name='Summary', index=False, startrow=len(summary_df) + 1)
+def _generate_excel_content(results, summary, case_list, url_list, aggregate, odcr_details):
+    output = BytesIO()
+    if aggregate is None:
+        aggregate = aggregate_results(results)
 
-        combined_fee_table_paid['date'] = pd.to_datetime(combined_fee_table_paid['date'])
+    # Create a summary DataFrame
+    summary_df = pd.DataFrame(data=summary, index=[0], columns=SUMMARY_COLUMNS)
+    summary_df['Max Consecutive Months Paid - All'] = aggregate.summary['Max Consecutive Months Paid - All']
+
+    # The per-case toplines and the combined paid ledger come from the aggregate
+    url_by_case = {}
+    for case_number, url in zip(case_list, url_list):
+        url_by_case.setdefault(case_number, url)
+    cases = aggregate.cases
+    individual_case_summaries = pd.DataFrame({
+        'Case Number': cases.index,
+        'URL': [url_by_case[case_number] for case_number in cases.index],
+        'Total Amount Owed': cases['total_amount_owed'].to_numpy(),
+        'Total Amount Paid': cases['total_amount_paid'].to_numpy(),
+        'Streak Length': cases['streak_length'].to_numpy(),
+        'Total Paid Months': cases['total_paid_months'].to_numpy(),
+    }, columns=CASE_SUMMARY_COLUMNS)
+
+    combined_fee_table_paid = aggregate.paid.drop(columns=['case', 'cents'])
+    if len(results):
         combined_fee_table_paid = combined_fee_table_paid.sort_values(by='date')
         combined_fee_table_paid['date'] = combined_fee_table_paid['date'].dt.strftime('%m-%d-%Y')
         combined_fee_table_paid.reset_index(drop=True, inplace=True)
-        combined_fee_table_paid.to_excel(writer, sheet_name='Summary', index=True,
-                                         startrow=len(summary_df) + len(individual_case_summaries) + 3)
-
-        # Save individual case information to separate sheets
-        for case_number, result in results.items():
-            url_index = case_list.index(case_number)
-            url = url_list[url_index]
-            streak_length, total_paid_months, _, total_amount_paid, total_amount_owed, _, _, fee_table_paid, fee_table_issued = result
-            receipts_table = None
-
-                # Create a DataFrame with the individual case information (topline)
-            case_info_df = pd.DataFrame(
-                data={
-                    'Case Number': [case_number],
-                    'URL': [url],
-                    'Total Amount Owed': [total_amount_owed],
-                    'Total Amount Paid': [total_amount_paid],
-                    'Streak Length': [streak_length],
-                    'Total Paid Months': [total_paid_months]
-                }
-            )
-
-            # Save the individual case information to a new sheet
-            case_info_df.to_excel(writer, sheet_name=f'Case {case_number}', index=False, startrow=0)
-
-            # Save fee_table_paid, fee_table_issued, and receipts_table to the same sheet
-            workbook = writer.book
-            worksheet = writer.sheets[f'Case {case_number}']
-
-            if fee_table_paid is not None:
-                fee_table_paid.to_excel(writer, sheet_name=f'Case {case_number}', index=False, startrow=5)
-                worksheet.write(4, 0, 'Fee Table Paid')
-            if fee_table_issued is not None:
-                fee_table_issued.to_excel(writer, sheet_name=f'Case {case_number}', index=False, startrow=5,
-                                          startcol=fee_table_paid.shape[1] + 1)
-                worksheet.write(4, fee_table_paid.shape[1] + 1, 'Fee Table Issued')
-            if receipts_table is not None:
-                startcol = fee_table_paid.shape[1] + fee_table_issued.shape[1] + 2
-                receipts_table.to_excel(writer, sheet_name=f'Case {case_number}', index=False, startrow=5,
-                                        startcol=startcol)
-                worksheet.write(4, startcol, 'Receipts Table')
-
-        output.seek(0)
-        return output
\ No newline at end of file
+    else:
+        combined_fee_table_paid = pd.DataFrame()
+
+    # Rows stream to disk as they are written (xlsxwriter constant_memory), so the
+    # workbook is never held in memory as a whole
+    workbook = StreamingWorkbook(output)
+
+    # Summary, individual_case_summaries, and combined_fee_table_paid on the first sheet
+    workbook.write_sheet(
+        'Summary',
+        frame_cells(summary_df),
+        frame_cells(individual_case_summaries, startrow=len(summary_df) + 1),
+        frame_cells(combined_fee_table_paid, startrow=len(summary_df) + len(individual_case_summaries) + 3,
+                    index=True),
+    )
+
+    # Individual case information, fee_table_paid, fee_table_issued, and receipts_table on one sheet per case.
+    # Case numbers repeat across counties, so ODCR receipts only go with the OSCN case from the same court.
+    oscn_keys = {oscn_case_key(case_number, url_by_case[case_number]) for case_number in results}
+    sheet_names = set()
+    for position, case_number in enumerate(results):
+        fee_table_paid = aggregate.case_rows(aggregate.paid, position)
+        fee_table_issued = aggregate.case_rows(aggregate.issued, position)
+        receipts_table = odcr_details.get(oscn_case_key(case_number, url_by_case[case_number]), (None, None))[1]
+
+        blocks = [frame_cells(individual_case_summaries.iloc[[position]])]
+        if fee_table_paid is not None:
+            blocks += [label_cell(4, 0, 'Fee Table Paid'), frame_cells(fee_table_paid, startrow=5)]
+        if fee_table_issued is not None:
+            startcol = fee_table_paid.shape[1] + 1
+            blocks += [label_cell(4, startcol, 'Fee Table Issued'),
+                       frame_cells(fee_table_issued, startrow=5, startcol=startcol)]
+        if receipts_table is not None:
+            startcol = fee_table_paid.shape[1] + fee_table_issued.shape[1] + 2
+            blocks += [label_cell(4, startcol, 'Receipts Table'),
+                       frame_cells(receipts_table, startrow=5, startcol=startcol)]
+        workbook.write_sheet(f'Case {case_number}', *blocks)
+        sheet_names.add(f'Case {case_number}'.lower())
+
+    # ODCR cases without an OSCN docket get a sheet of their own for their receipts,
+    # named with the court too when another county's case has the number
+    for (court, case_number), (amount_owed, receipts_table) in odcr_details.items():
+        if (court, case_number) in oscn_keys or receipts_table is None:
+            continue
+        name = f'Case {case_number}'
+        if name.lower() in sheet_names:
+            name = f'Case {case_number} {court}'[:31]
+        # Excel sheet names are at most 31 characters and unique regardless of case
+        suffix = 2
+        while name.lower() in sheet_names:
+            name = f'Case {case_number} {court}'[:28] + f' {suffix}'
+            suffix += 1
+        sheet_names.add(name.lower())
+        case_info = pd.DataFrame({'Case Number': [case_number], 'Court': [court], 'Amount Owed': [amount_owed]})
+        workbook.write_sheet(name, frame_cells(case_info), label_cell(4, 0, 'Receipts Table'),
+                             frame_cells(receipts_table, startrow=5))
+
+    workbook.close()
+    output.seek(0)
+    return output
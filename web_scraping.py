@@ -1,18 +1,21 @@
-import re
-import requests
+import os
+from urllib.parse import urljoin
 import streamlit as st
-from selenium import webdriver
-from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException
 from bs4 import BeautifulSoup
 import time
-import httpx
 import pandas as pd
 
+from docket_parser import parse_docket as extract_docket_table
+from driver_pool import driver_pool
+from endpoints import ODCR_BASE_URL
+from odcr_details import parse_odcr_detail_fast
+from http_cache import cached_get
+from transport import RetryingClient
+
 
 def navigate_and_get_url_soup(url_list, case_list, guid):
     headers = {
@@ -21,17 +24,17 @@ def navigate_and_get_url_soup(url_list, case_list, guid):
 
     case_soup_dict = {}
 
-    with httpx.Client() as client:
-        for url, case_number in zip(url_list, case_list):
-            # Navigate to the website
-            response = client.get(url, headers=headers)
-            response.raise_for_status()  # Ensure we've got a successful response
+    for url, case_number in zip(url_list, case_list):
+        # Navigate to the website
+        response = cached_get(url, headers=headers)
+        response.raise_for_status()  # Ensure we've got a successful response
 
-            # Parse the response with BeautifulSoup
-            soup = BeautifulSoup(response.text, 'html.parser')
+        # Parse the response with BeautifulSoup
+        soup = BeautifulSoup(response.text, 'html.parser')
 
-            # Add the case number and soup to the dictionary
-            case_soup_dict[case_number] = soup
+        # Add the case number and soup to the dictionary
+        case_soup_dict[case_number] = soup
+        if not getattr(response, 'from_cache', False):
             time.sleep(1)
 
     return case_soup_dict
@@ -72,63 +75,149 @@ def extract_fee_table(soup):
     return dataframes
 
 
-def extract_docket_table(soup):
-    tables = soup.select("table.docketlist.ocis, table.docketlist.kp")
-    dataframes = []
-    for table in tables:
-        try:
-            df = pd.read_html(str(table))[0]
-            dataframes.append(df)
-        except:
-            pass
-    fee_table = pd.concat(dataframes)
-    fee_table.columns = [col.lower() for col in fee_table.columns]
-    fee_table['date'] = fee_table['date'].fillna(method='ffill')
-    default_amount = ""
-    fee_table['amount'].fillna(default_amount, inplace=True)
-
-    return fee_table
+RESULTS_TABLES = "table[id*='results-list']"
+RESULTS_TIMEOUT = 10
+
+
+class results_settled:
+    """Wait condition: the results-list tables are present and their row count held steady for one poll."""
+
+    def __init__(self):
+        self.rows = None
+
+    def __call__(self, driver):
+        if not driver.find_elements(By.CSS_SELECTOR, RESULTS_TABLES):
+            return False
+        rows = len(driver.find_elements(By.CSS_SELECTOR, RESULTS_TABLES + " tr"))
+        settled = rows == self.rows
+        self.rows = rows
+        return settled
+
+
+ODCR_SEARCH_ENGINE = os.environ.get("ODCR_SEARCH_ENGINE", "browser")
+MAX_RESULT_PAGES = 20
+NEXT_PAGE_TEXT = {'next', 'next >', 'next »', '>', '»', '›'}
+
+
+def search_form_fields(form, party_input, party_name):
+    # The fields a browser would submit: named inputs (checked boxes only), selects and textareas
+    data = {}
+    for field in form.find_all(['input', 'select', 'textarea']):
+        name = field.get('name')
+        if not name or field.has_attr('disabled'):
+            continue
+        if field.name == 'select':
+            option = field.find('option', selected=True) or field.find('option')
+            data[name] = option.get('value', option.text) if option else ''
+        elif field.name == 'textarea':
+            data[name] = field.text
+        else:
+            kind = field.get('type', 'text').lower()
+            if kind in ('submit', 'button', 'image', 'reset', 'file'):
+                continue
+            if kind in ('checkbox', 'radio') and not field.has_attr('checked'):
+                continue
+            data[name] = field.get('value', '')
+    data[party_input['name']] = party_name
+
+    # Include the clicked submit button, as the browser does
+    submit = form.find('input', {'type': 'submit'}) or form.find('button', {'type': 'submit'})
+    if submit is not None and submit.get('name'):
+        data[submit['name']] = submit.get('value', '')
+    return data
+
+
+def next_page_url(soup, page_url):
+    link = soup.find('a', rel='next') or soup.find(
+        'a', href=True, string=lambda text: text is not None and text.strip().lower() in NEXT_PAGE_TEXT)
+    if link is None or not link.get('href') or link['href'].startswith(('#', 'javascript:')):
+        return None
+    return urljoin(page_url, link['href'])
+
+
+def search_cases_http(party_name, client=None):
+    """ODCR party search without a browser: replay the search form over HTTP and follow result pages.
+
+    Returns the same list of `results-list` DataFrames as the browser path,
+    with each table's rows from later pages appended.
+    """
+    own_client = client is None
+    # Its own client, as the form flow carries cookies; connections are still kept alive across its pages
+    client = client or RetryingClient()
+    try:
+        response = client.get(ODCR_BASE_URL)
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, 'html.parser')
+        party_input = soup.find(id='search-party')
+        form = party_input.find_parent('form')
+
+        action = urljoin(str(response.url), form.get('action') or '')
+        data = search_form_fields(form, party_input, party_name)
+        if form.get('method', 'get').lower() == 'post':
+            response = client.post(action, data=data)
+        else:
+            response = client.get(action, params=data)
+        response.raise_for_status()
+
+        pages = []
+        seen = {str(response.url)}
+        for _ in range(MAX_RESULT_PAGES):
+            soup = BeautifulSoup(response.text, 'html.parser')
+            pages.append(extract_fee_table(soup))
+            url = next_page_url(soup, str(response.url))
+            if url is None or url in seen:
+                break
+            seen.add(url)
+            response = client.get(url)
+            response.raise_for_status()
+
+        # Table i of every page continues table i of the first
+        n_tables = max((len(page) for page in pages), default=0)
+        return [pd.concat([page[i] for page in pages if i < len(page)], ignore_index=True) for i in range(n_tables)]
+    finally:
+        if own_client:
+            client.close()
 
 
 @st.cache_data
-def search_cases(party_name):
-    url = "https://www1.odcr.com/"
+def search_cases(party_name, engine=None):
+    # engine: "browser" drives headless Chrome, "http" replays the form without one
+    if (engine or ODCR_SEARCH_ENGINE) == "http":
+        return search_cases_http(party_name)
 
-    # Set up Chrome options for headless mode
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument('--headless')
+    url = ODCR_BASE_URL
 
-    # Create a new instance of the Chrome driver with headless mode
-    service = Service(executable_path=ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # Borrow a warm headless Chrome from the process-wide pool
+    with driver_pool().driver() as driver:
+        # Navigate to the website
+        driver.get(url)
 
-    # Navigate to the website
-    driver.get(url)
+        # Find the input field by id and send the party_name
+        input_element = driver.find_element(By.ID, "search-party")
+        input_element.send_keys(party_name)
 
-    # Find the input field by id and send the party_name
-    input_element = driver.find_element(By.ID, "search-party")
-    input_element.send_keys(party_name)
+        # Click the "Search for cases" button
+        submit_button = driver.find_element(By.XPATH, '//input[@type="submit"]')
+        submit_button.click()
 
-    # Click the "Search for cases" button
-    submit_button = driver.find_element(By.XPATH, '//input[@type="submit"]')
-    submit_button.click()
+        # Wait for the results page to replace the form; if it never does the search
+        # failed, and the timeout goes up rather than reading the form as no results
+        WebDriverWait(driver, RESULTS_TIMEOUT).until(EC.staleness_of(submit_button))
 
-    # Wait for the table to load
-    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, 'table')))
+        # Then for its tables to finish filling in
+        try:
+            WebDriverWait(driver, RESULTS_TIMEOUT, poll_frequency=0.1).until(results_settled())
+        except TimeoutException:
+            pass  # no results-list tables, e.g. no matching parties
 
-    # Add an explicit wait to allow more time for the tables to load
-    time.sleep(2)
+        # Get the page source and parse it with BeautifulSoup
+        html_content = driver.page_source
 
-    # Get the page source and parse it with BeautifulSoup
-    html_content = driver.page_source
     soup = BeautifulSoup(html_content, 'html.parser')
 
     # Extract the DataFrames using BeautifulSoup
     dataframes = extract_fee_table(soup)
 
-    # Close the browser window
-    driver.quit()
-
     return dataframes
 
 
@@ -144,27 +233,8 @@ def modify_crf_number(value):
 def scrape_odcr(url):
     # Add the desired URL prefix to the URL if it doesn't have one already
     if not url.startswith('http'):
-        url = "https://www1.odcr.com/" + url
-
-    # Send a GET request to the website and get the page content
-    response = requests.get(url)
-    html_content = response.content
-
-    # Parse the HTML content with BeautifulSoup
-    soup = BeautifulSoup(html_content, 'html.parser')
+        url = ODCR_BASE_URL + url
 
-    # Extract the amount owed from the table
-    amount_owed = None
-    th_elements = soup.find_all('th', text="Amount Owed")
-    if th_elements:
-        td_element = th_elements[0].find_next('td')
-        amount_owed_str = td_element.text.strip().split()[0]
-        amount_owed = float(amount_owed_str.replace('$', ''))
-
-    # Extract the table under the section id named "receipts"
-    receipts_table = None
-    receipts_section = soup.find('section', {'id': 'receipts'})
-    if receipts_section:
-        receipts_table = pd.read_html(str(receipts_section))[0].iloc[:-1]
-
-    return amount_owed, receipts_table
\ No newline at end of file
+    # Send a GET request to the website and read the amount owed and receipts table from the page
+    response = cached_get(url)
+    return parse_odcr_detail_fast(response.content)
\ No newline at end of file